@@ -0,0 +1,100 @@
+"""Moving old completed tasks between the live and archive tables."""
+
+from collections import Counter
+from datetime import datetime, timedelta
+from flask import current_app
+from app.models import db, Task, TaskArchive, TaskArchiveCount
+from app.sharding import each_shard
+
+
+def archive_completed_tasks(older_than_days=None, chunk_size=None):
+    """Move tasks completed more than older_than_days ago to the archive.
+
+    Tasks are moved in chunks, each in its own short transaction, so the
+    live table is never locked for long. Every shard is archived in turn.
+    Returns the number of tasks moved.
+    """
+    if older_than_days is None:
+        older_than_days = current_app.config["ARCHIVE_AFTER_DAYS"]
+    chunk_size = chunk_size or current_app.config["ARCHIVE_CHUNK_SIZE"]
+
+    # A completed task's last update is when it was completed
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    archivable = (Task.status == "completed", Task.updated_at < cutoff)
+    columns = [Task.__table__.c[name] for name in Task.COPIED_COLUMNS]
+
+    archived = 0
+    for _ in each_shard():
+        while True:
+            ids = db.session.scalars(
+                db.select(Task.id).where(*archivable).order_by(Task.updated_at).limit(chunk_size)
+            ).all()
+            if not ids:
+                break
+
+            # Repeat the conditions so a task reopened since the lookup stays live
+            rows = db.select(*columns, db.literal(datetime.utcnow(), db.DateTime)).where(
+                Task.id.in_(ids), *archivable
+            )
+            db.session.execute(
+                db.insert(TaskArchive).from_select([*Task.COPIED_COLUMNS, "archived_at"], rows)
+            )
+            moved = db.session.execute(
+                db.select(TaskArchive.status, TaskArchive.priority, db.func.count())
+                .where(TaskArchive.id.in_(ids))
+                .group_by(TaskArchive.status, TaskArchive.priority)
+            )
+            TaskArchiveCount.adjust({(status, priority): n for status, priority, n in moved})
+            deleted = db.session.execute(db.delete(Task).where(Task.id.in_(ids), *archivable))
+            db.session.commit()
+
+            archived += deleted.rowcount
+
+    return archived
+
+
+def restore_task(task_id):
+    """Move an archived task back to the live table.
+
+    Returns the restored task, or None if no archived task has this ID.
+    The caller picks the task's shard and commits the change.
+    """
+    archived = db.session.get(TaskArchive, task_id)
+    if archived is None:
+        return None
+
+    task = Task(**{name: getattr(archived, name) for name in Task.COPIED_COLUMNS})
+    delete_archived_tasks([archived])
+    db.session.add(task)
+    return task
+
+
+def delete_archived_tasks(tasks):
+    """Delete archived tasks and take them off the archive counts.
+
+    The caller picks the tasks' shard and commits the change.
+    """
+    TaskArchiveCount.adjust(Counter((task.status, task.priority) for task in tasks), sign=-1)
+    for task in tasks:
+        db.session.delete(task)
+
+
+def archived_counts():
+    """Number of archived tasks on the current shard by (status, priority)."""
+    rows = db.session.execute(
+        db.select(TaskArchiveCount.status, TaskArchiveCount.priority, TaskArchiveCount.count)
+    )
+    return {(status, priority): count for status, priority, count in rows}
+
+
+def recount_archived_tasks():
+    """Rebuild the archive counts of every shard from the archive itself."""
+    for _ in each_shard():
+        db.session.execute(db.delete(TaskArchiveCount))
+        rows = db.session.execute(
+            db.select(TaskArchive.status, TaskArchive.priority, db.func.count()).group_by(
+                TaskArchive.status, TaskArchive.priority
+            )
+        )
+        TaskArchiveCount.adjust({(status, priority): n for status, priority, n in rows})
+        db.session.commit()
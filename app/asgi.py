@@ -0,0 +1,332 @@
+"""ASGI entry point with async variants of the read-heavy routes.
+
+GET /api/tasks, /api/tasks/<id>, /api/users and /api/stats are served by
+coroutines on an async SQLAlchemy engine, so a slow query no longer pins
+a worker thread, and /api/tasks/stream waits for events on the event loop.
+Every other request falls through to the Flask app on a thread pool, as
+do all reads when tasks are sharded over several databases.
+
+Run with an ASGI server, for example:
+
+    uvicorn app.asgi:app --host 0.0.0.0 --port 8000 --timeout-graceful-shutdown 10
+
+Open event streams only end when the client leaves, so give the server a
+graceful shutdown timeout after which it cancels them.
+"""
+
+import asyncio
+import heapq
+import queue
+import re
+from operator import attrgetter
+from urllib.parse import parse_qs
+from asgiref.sync import sync_to_async
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+from sqlalchemy import func, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import selectinload
+from app.events import format_event
+from app.main import create_app
+from app.models import (
+    User,
+    Task,
+    TaskArchive,
+    TaskArchiveCount,
+    Category,
+    TASK_CHOICES,
+    TASK_PRIORITIES,
+    TASK_STATUSES,
+)
+from app.utils import page_bounds, paginate_merged
+
+# Async drivers to use for each synchronous database backend
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "mysql": "mysql+aiomysql",
+}
+
+
+def async_database_uri(config):
+    """Get the async database URI, derived from the sync one if not set."""
+    if config.get("SQLALCHEMY_ASYNC_DATABASE_URI"):
+        return config["SQLALCHEMY_ASYNC_DATABASE_URI"]
+
+    url = make_url(config["SQLALCHEMY_DATABASE_URI"])
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver known for {backend}, set ASYNC_DATABASE_URL")
+
+    return url.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+
+def query_arg(query, name, type=str):
+    """Get a query string argument the way request.args.get() does."""
+    values = query.get(name)
+    if not values:
+        return None
+    try:
+        return type(values[0])
+    except ValueError:
+        return None
+
+
+class ThreadPoolWsgiInstance(WsgiToAsgiInstance):
+    """WsgiToAsgiInstance running the WSGI app on the loop's thread pool."""
+
+    # The base class runs every request on one shared thread, so a single slow
+    # request would hold up all the others
+    run_wsgi_app = sync_to_async(
+        WsgiToAsgiInstance.__dict__["run_wsgi_app"].func, thread_sensitive=False
+    )
+
+
+class ThreadPoolWsgiToAsgi(WsgiToAsgi):
+    """WsgiToAsgi adapter that serves requests concurrently from a thread pool."""
+
+    async def __call__(self, scope, receive, send):
+        await ThreadPoolWsgiInstance(self.wsgi_application, self.duplicate_header_limit)(
+            scope, receive, send
+        )
+
+
+class AsyncApp:
+    """ASGI application serving read-heavy routes asynchronously."""
+
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        self.wsgi_app = ThreadPoolWsgiToAsgi(flask_app)
+        self.engine = create_async_engine(async_database_uri(flask_app.config))
+        self.sessions = async_sessionmaker(self.engine, expire_on_commit=False)
+        self.routes = [
+            (re.compile(r"/api/tasks"), self.get_tasks),
+            (re.compile(r"/api/tasks/(?P<task_id>\d+)"), self.get_task),
+            (re.compile(r"/api/users"), self.get_users),
+            (re.compile(r"/api/stats"), self.get_statistics),
+        ]
+        if flask_app.config["TASK_SHARDS"] > 1:
+            # The async engine only reaches the main database
+            self.routes = []
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self.lifespan(receive, send)
+            return
+
+        if scope["type"] == "http" and scope["method"] == "GET":
+            if scope["path"] == "/api/tasks/stream":
+                await self.stream_tasks(scope, receive, send)
+                return
+
+            for pattern, handler in self.routes:
+                match = pattern.fullmatch(scope["path"])
+                if match:
+                    query = parse_qs(scope["query_string"].decode("latin-1"))
+                    status, body = await handler(query, **match.groupdict())
+                    await self.send_json(scope, send, status, body)
+                    return
+
+        await self.wsgi_app(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        """Handle ASGI startup and shutdown."""
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.engine.dispose()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def send_json(self, scope, send, status, body):
+        """Send a JSON response encoded by the Flask app's JSON provider."""
+        content = self.flask_app.json.dumps(body).encode() + b"\n"
+        headers = [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(content)).encode()),
+        ]
+        await send_start(scope, send, status, headers)
+        await send({"type": "http.response.body", "body": content})
+
+    async def stream_tasks(self, scope, receive, send):
+        """Stream task changes as Server-Sent Events."""
+        query = parse_qs(scope["query_string"].decode("latin-1"))
+        broker = self.flask_app.extensions["event_broker"]
+        subscription = broker.subscribe(
+            user_id=query_arg(query, "user_id", type=int),
+            status=query_arg(query, "status"),
+        )
+        heartbeat = self.flask_app.config["EVENT_HEARTBEAT_SECONDS"]
+
+        # Events are published from request threads, wake the loop up for them
+        loop = asyncio.get_running_loop()
+        ready = asyncio.Event()
+        subscription.on_put = lambda: loop.call_soon_threadsafe(ready.set)
+        disconnected = asyncio.ensure_future(wait_for_disconnect(receive))
+
+        async def send_text(text, more_body=True):
+            await send(
+                {"type": "http.response.body", "body": text.encode(), "more_body": more_body}
+            )
+
+        try:
+            headers = [
+                (b"content-type", b"text/event-stream; charset=utf-8"),
+                (b"cache-control", b"no-cache"),
+                (b"x-accel-buffering", b"no"),
+            ]
+            await send_start(scope, send, 200, headers)
+            await send_text(": connected\n\n")
+
+            while True:
+                ready.clear()
+                try:
+                    event = subscription.get_nowait()
+                except queue.Empty:
+                    waiter = asyncio.ensure_future(ready.wait())
+                    done, _ = await asyncio.wait(
+                        {waiter, disconnected},
+                        timeout=heartbeat,
+                        return_when=asyncio.FIRST_COMPLETED,
+                    )
+                    waiter.cancel()
+                    if disconnected in done:
+                        return
+                    if not done:
+                        await send_text(": keep-alive\n\n")
+                    continue
+
+                if event is None:
+                    await send_text(format_event(event), more_body=False)
+                    return
+                await send_text(format_event(event))
+        finally:
+            disconnected.cancel()
+            broker.unsubscribe(subscription)
+
+    async def get_tasks(self, query):
+        """Get all tasks with optional filtering."""
+        status = query_arg(query, "status")
+        priority = query_arg(query, "priority")
+        user_id = query_arg(query, "user_id", type=int)
+        page = query_arg(query, "page", type=int)
+
+        for field, value in (("status", status), ("priority", priority)):
+            if value and value not in TASK_CHOICES[field]:
+                return 400, {"error": f"Invalid {field} filter"}
+
+        models = [Task]
+        if (query_arg(query, "include_archived") or "").lower() == "true":
+            models.append(TaskArchive)
+
+        if page is not None:
+            per_page = query_arg(query, "per_page", type=int)
+            page, per_page = page_bounds(page, 20 if per_page is None else per_page)
+
+        results = []
+        total = 0
+        async with self.sessions() as session:
+            for model in models:
+                statement = select(model)
+
+                if status:
+                    statement = statement.filter_by(status=status)
+                if priority:
+                    statement = statement.filter_by(priority=priority)
+                if user_id:
+                    statement = statement.filter_by(user_id=user_id)
+
+                statement = statement.order_by(model.created_at, model.id)
+                if page is not None:
+                    count = select(func.count()).select_from(statement.order_by(None).subquery())
+                    total += await session.scalar(count)
+                    statement = statement.limit(page * per_page)
+
+                results.append((await session.scalars(statement)).all())
+
+        tasks = list(heapq.merge(*results, key=attrgetter("created_at", "id")))
+        if page is None:
+            return 200, [task.to_dict() for task in tasks]
+
+        return 200, paginate_merged(tasks, total, page, per_page)
+
+    async def get_task(self, query, task_id):
+        """Get a specific task by ID, reading through to the archive."""
+        async with self.sessions() as session:
+            task = await session.get(Task, int(task_id))
+            if task is None:
+                task = await session.get(TaskArchive, int(task_id))
+            if task is None:
+                return 404, {"error": "Resource not found"}
+            return 200, task.to_dict()
+
+    async def get_users(self, query):
+        """Get all users."""
+        # Load tasks up front, lazy loading is not available on async sessions
+        statement = select(User).options(selectinload(User.tasks))
+
+        archived = select(TaskArchive.user_id, func.count()).group_by(TaskArchive.user_id)
+
+        async with self.sessions() as session:
+            users = (await session.scalars(statement)).all()
+            archived_counts = dict((await session.execute(archived)).tuples().all())
+            return 200, [user.to_dict(archived_counts.get(user.id, 0)) for user in users]
+
+    async def get_statistics(self, query):
+        """Get application statistics."""
+        async with self.sessions() as session:
+            total_users = await session.scalar(select(func.count()).select_from(User))
+            total_tasks = await session.scalar(select(func.count()).select_from(Task))
+            total_categories = await session.scalar(select(func.count()).select_from(Category))
+            by_status = await count_by(session, Task.status)
+            by_priority = await count_by(session, Task.priority)
+
+            # Archived tasks are counted as they move, not by scanning the archive
+            archived = await session.execute(
+                select(TaskArchiveCount.status, TaskArchiveCount.priority, TaskArchiveCount.count)
+            )
+            for status, priority, count in archived.tuples():
+                total_tasks += count
+                by_status[status] = by_status.get(status, 0) + count
+                by_priority[priority] = by_priority.get(priority, 0) + count
+
+        return 200, {
+            "total_users": total_users,
+            "total_tasks": total_tasks,
+            "total_categories": total_categories,
+            "tasks_by_status": {status: by_status.get(status, 0) for status in TASK_STATUSES},
+            "tasks_by_priority": {
+                priority: by_priority.get(priority, 0) for priority in TASK_PRIORITIES
+            },
+        }
+
+
+async def send_start(scope, send, status, headers):
+    """Start a response, allowing cross-origin requests like the Flask app."""
+    if any(name == b"origin" for name, _ in scope["headers"]):
+        headers = headers + [(b"access-control-allow-origin", b"*")]
+
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+
+
+async def wait_for_disconnect(receive):
+    """Wait until the client goes away."""
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+async def count_by(session, column):
+    """Count tasks grouped by a column, in one query."""
+    result = await session.execute(select(column, func.count()).group_by(column))
+    return dict(result.tuples().all())
+
+
+def create_asgi_app(flask_app=None):
+    """Create the ASGI application around a Flask application."""
+    return AsyncApp(flask_app or create_app())
+
+
+# Create the application instance
+app = create_asgi_app()
@@ -0,0 +1,127 @@
+"""Dispatching batched sub-requests through the application's own routes."""
+
+from flask import g, jsonify
+from werkzeug.exceptions import HTTPException
+from werkzeug.test import EnvironBuilder
+from app.events import publish_deferred_events
+from app.models import db
+
+BATCH_METHODS = {"GET", "POST", "PUT", "DELETE"}
+
+# Endpoints that cannot run inside a batch: nested batches and event streams
+BATCH_EXCLUDED_ENDPOINTS = {"batch", "stream_tasks"}
+
+
+def validate_sub_request(app, sub_request):
+    """Return an error message if a sub-request cannot be dispatched."""
+    if not isinstance(sub_request, dict):
+        return "Each request must be an object"
+
+    method = sub_request.get("method", "GET")
+    path = sub_request.get("path")
+
+    if method not in BATCH_METHODS:
+        return f"Unsupported method: {method}"
+    if not isinstance(path, str) or not path.startswith("/"):
+        return "Each request needs a path starting with /"
+
+    try:
+        endpoint, _ = app.url_map.bind("").match(path.split("?", 1)[0], method=method)
+    except HTTPException:
+        # Let the route dispatch produce the usual 404/405 response
+        return None
+
+    if endpoint in BATCH_EXCLUDED_ENDPOINTS:
+        return f"{path} cannot be used in a batch"
+
+    return None
+
+
+def dispatch_sub_request(app, method, path, body):
+    """Run one sub-request through the Flask routes and return (status, body)."""
+    builder = EnvironBuilder(path=path, method=method, json=body)
+    try:
+        environ = builder.get_environ()
+    finally:
+        builder.close()
+
+    # The sub-request shares the batch's application context, and with it the
+    # database session, so an atomic batch sees its own uncommitted writes
+    with app.request_context(environ):
+        try:
+            response = app.full_dispatch_request()
+        except Exception:
+            app.logger.exception("Batch sub-request %s %s failed", method, path)
+            db.session.rollback()
+            response = jsonify({"error": "Internal server error"})
+            response.status_code = 500
+
+    return response.status_code, response.get_json(silent=True)
+
+
+def run_batch(app, sub_requests, atomic=False):
+    """Dispatch sub-requests in order and collect their responses.
+
+    Identical GETs are answered once, as long as no write happened in
+    between. With atomic=True everything runs in a single transaction that
+    is rolled back when any sub-request fails, in which case the remaining
+    sub-requests are skipped. Returns the responses and whether the batch
+    committed.
+    """
+    responses = []
+    cached_gets = {}
+    failed = False
+
+    g.defer_commit = atomic
+    g.deferred_events = []
+    try:
+        for sub_request in sub_requests:
+            if failed:
+                responses.append(
+                    {
+                        "status": 424,
+                        "body": {"error": "Skipped because an earlier request failed"},
+                    }
+                )
+                continue
+
+            error = validate_sub_request(app, sub_request)
+            if error:
+                status, body = 400, {"error": error}
+            else:
+                method = sub_request.get("method", "GET")
+                path = sub_request["path"]
+
+                if method == "GET" and path in cached_gets:
+                    status, body = cached_gets[path]
+                else:
+                    status, body = dispatch_sub_request(app, method, path, sub_request.get("body"))
+
+                if method == "GET":
+                    cached_gets[path] = (status, body)
+                else:
+                    cached_gets.clear()
+
+            responses.append({"status": status, "body": body})
+            if status >= 400:
+                if atomic:
+                    failed = True
+                else:
+                    # Drop whatever the failed request changed before bailing out,
+                    # so the next sub-request does not commit it
+                    db.session.rollback()
+
+        if atomic:
+            if failed:
+                db.session.rollback()
+            else:
+                db.session.commit()
+    finally:
+        g.defer_commit = False
+
+    if failed:
+        g.pop("deferred_events", None)
+    else:
+        publish_deferred_events()
+
+    return responses, not failed
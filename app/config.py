@@ -11,6 +11,11 @@ load_dotenv()
 BASE_DIR = Path(__file__).parent.parent
 
 
+def task_shard_binds(url_template, shards):
+    """Database binds of task shards 1 to shards - 1; shard 0 is the main database."""
+    return {f"shard{shard}": url_template.format(shard=shard) for shard in range(1, shards)}
+
+
 class Config:
     """Base configuration class."""
 
@@ -19,8 +24,44 @@ class Config:
         "DATABASE_URL", f"sqlite:///{BASE_DIR / 'tasks.db'}"
     )
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Used by the ASGI entry point; derived from DATABASE_URL when unset
+    SQLALCHEMY_ASYNC_DATABASE_URI = os.getenv("ASYNC_DATABASE_URL")
     JSON_SORT_KEYS = False
 
+    # How long deleted tasks are reported by /api/tasks/changes
+    TOMBSTONE_RETENTION_DAYS = int(os.getenv("TOMBSTONE_RETENTION_DAYS", "30"))
+    # Sync cursors stay this far behind the clock, so a write stamped before a
+    # slower one but committed after it is still returned by the next sync
+    SYNC_CURSOR_LAG_SECONDS = float(os.getenv("SYNC_CURSOR_LAG_SECONDS", "10"))
+
+    # Task change events for /api/tasks/stream
+    EVENT_BROKER = os.getenv("EVENT_BROKER", "app.events.InProcessBroker")
+    EVENT_QUEUE_SIZE = int(os.getenv("EVENT_QUEUE_SIZE", "100"))
+    EVENT_HEARTBEAT_SECONDS = float(os.getenv("EVENT_HEARTBEAT_SECONDS", "15"))
+
+    # Completed tasks older than this are moved to the tasks_archive table
+    ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "30"))
+    ARCHIVE_CHUNK_SIZE = int(os.getenv("ARCHIVE_CHUNK_SIZE", "500"))
+
+    # Maximum number of sub-requests accepted by /api/batch
+    BATCH_MAX_REQUESTS = int(os.getenv("BATCH_MAX_REQUESTS", "50"))
+
+    # Tasks are split by user across this many databases (1 disables sharding).
+    # Shard 0 is the main database, the others use TASK_SHARD_URL
+    TASK_SHARDS = int(os.getenv("TASK_SHARDS", "1"))
+    TASK_SHARD_URL = os.getenv("TASK_SHARD_URL", f"sqlite:///{BASE_DIR / 'tasks_shard{shard}.db'}")
+    # Shard count before a reshard, so `init_db.py reshard` can reach the old shards
+    RESHARD_FROM = int(os.getenv("RESHARD_FROM", "0"))
+    SQLALCHEMY_BINDS = task_shard_binds(TASK_SHARD_URL, max(TASK_SHARDS, RESHARD_FROM))
+
+    # Commit concurrent writes together from one writer thread: a batch is
+    # committed once it holds MAX_BATCH writes or MAX_WAIT_MS after its first one
+    GROUP_COMMIT = os.getenv("GROUP_COMMIT", "false").lower() == "true"
+    GROUP_COMMIT_MAX_BATCH = int(os.getenv("GROUP_COMMIT_MAX_BATCH", "64"))
+    GROUP_COMMIT_MAX_WAIT_MS = float(os.getenv("GROUP_COMMIT_MAX_WAIT_MS", "2"))
+    # A request gives up on its write if the writer has not finished it by then
+    GROUP_COMMIT_TIMEOUT_SECONDS = float(os.getenv("GROUP_COMMIT_TIMEOUT_SECONDS", "30"))
+
 
 class DevelopmentConfig(Config):
     """Development configuration."""
@@ -39,6 +80,10 @@ class TestingConfig(Config):
 
     TESTING = True
     SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+    TASK_SHARDS = 1
+    RESHARD_FROM = 0
+    SQLALCHEMY_BINDS = {}
+    GROUP_COMMIT = False
 
 
 # Configuration dictionary
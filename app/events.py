@@ -0,0 +1,151 @@
+"""Task change events and the brokers that fan them out to subscribers."""
+
+import json
+import queue
+import threading
+from abc import ABC, abstractmethod
+from flask import current_app, g
+
+
+class Subscription:
+    """A subscriber's bounded queue of events, with optional filters."""
+
+    def __init__(self, queue_size, user_id=None, status=None):
+        self.user_id = user_id
+        self.status = status
+        self.overflowed = False
+        # Called from the publishing thread after each event is queued, so an
+        # async consumer can wait on its event loop instead of in get()
+        self.on_put = None
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+
+    def matches(self, event):
+        """Check whether an event passes this subscription's filters."""
+        task = event["task"]
+        if self.user_id and task["user_id"] != self.user_id:
+            return False
+        if self.status and self.status not in (task["status"], event.get("previous_status")):
+            return False
+        return True
+
+    def put(self, event):
+        """Queue an event without blocking; overflow closes the subscription."""
+        with self._lock:
+            if self.overflowed:
+                return
+            try:
+                self._queue.put_nowait(event)
+            except queue.Full:
+                # Never let a slow consumer hold up the publisher. Drop what it
+                # has not read yet and tell it to resync from /api/tasks/changes.
+                self.overflowed = True
+                while True:
+                    try:
+                        self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                self._queue.put_nowait(None)
+
+        if self.on_put:
+            self.on_put()
+
+    def get(self, timeout=None):
+        """Wait for the next event; None means the subscription was closed."""
+        return self._queue.get(timeout=timeout)
+
+    def get_nowait(self):
+        """Get the next event if one is queued, otherwise raise queue.Empty."""
+        return self._queue.get_nowait()
+
+
+class Broker(ABC):
+    """Interface for event brokers.
+
+    The default broker only reaches subscribers in the same process. Set
+    EVENT_BROKER to the import path of another subclass (for example one
+    backed by Redis pub/sub) to fan out across worker processes.
+    """
+
+    @classmethod
+    def from_config(cls, config):
+        """Create a broker from the application config."""
+        return cls(queue_size=config["EVENT_QUEUE_SIZE"])
+
+    @abstractmethod
+    def publish(self, event):
+        """Deliver an event to every matching subscriber."""
+
+    @abstractmethod
+    def subscribe(self, user_id=None, status=None):
+        """Register a new subscription."""
+
+    @abstractmethod
+    def unsubscribe(self, subscription):
+        """Remove a subscription."""
+
+
+class InProcessBroker(Broker):
+    """Broker that fans events out to subscribers in this process."""
+
+    def __init__(self, queue_size=100):
+        self.queue_size = queue_size
+        self._subscriptions = set()
+        self._lock = threading.Lock()
+
+    def publish(self, event):
+        """Deliver an event to every matching subscriber."""
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+
+        for subscription in subscriptions:
+            if subscription.matches(event):
+                subscription.put(event)
+
+            if subscription.overflowed:
+                self.unsubscribe(subscription)
+
+    def subscribe(self, user_id=None, status=None):
+        """Register a new subscription."""
+        subscription = Subscription(self.queue_size, user_id=user_id, status=status)
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """Remove a subscription."""
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+
+def format_event(event):
+    """Format an event from a subscription as a Server-Sent Events message."""
+    if event is None:
+        # Fell too far behind; the client should resync via /changes
+        return "event: reset\ndata: {}\n\n"
+
+    return f"id: {event['cursor']}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+
+def publish_task_event(event_type, task, cursor, previous_status=None):
+    """Publish a task change event to the application's broker.
+
+    Call this only after the change has been committed, so subscribers
+    never see changes that were rolled back. Inside an atomic batch the
+    event is held back until the batch commits.
+    """
+    event = {"type": event_type, "task": task, "cursor": cursor}
+    if previous_status:
+        event["previous_status"] = previous_status
+
+    if g.get("defer_commit"):
+        g.deferred_events.append(event)
+    else:
+        current_app.extensions["event_broker"].publish(event)
+
+
+def publish_deferred_events():
+    """Publish the events held back by an atomic batch."""
+    broker = current_app.extensions["event_broker"]
+    for event in g.pop("deferred_events", []):
+        broker.publish(event)
@@ -0,0 +1,157 @@
+"""Coalescing small concurrent writes into shared transactions.
+
+With GROUP_COMMIT enabled, write routes hand their changes to a single
+writer thread instead of committing them themselves. The writer waits up
+to GROUP_COMMIT_MAX_WAIT_MS for more writes to arrive, runs up to
+GROUP_COMMIT_MAX_BATCH of them in one transaction and commits once, so
+concurrent requests share one fsync and one lock acquisition instead of
+queueing for their own.
+"""
+
+import queue
+import threading
+import time
+from concurrent import futures
+from flask import current_app, g
+from app.models import db, current_shard
+from app.sharding import use_shard
+from app.utils import commit_session
+
+
+class GroupCommitter:
+    """Writer thread committing queued writes together."""
+
+    def __init__(self, app, max_batch, max_wait, timeout=None):
+        self.app = app
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.timeout = timeout
+        self.queue = queue.Queue()
+        self.thread = None
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, app):
+        """Create a group committer for an application from its settings."""
+        return cls(
+            app,
+            max_batch=app.config["GROUP_COMMIT_MAX_BATCH"],
+            max_wait=app.config["GROUP_COMMIT_MAX_WAIT_MS"] / 1000,
+            timeout=app.config["GROUP_COMMIT_TIMEOUT_SECONDS"],
+        )
+
+    def submit(self, unit):
+        """Queue a write and wait for it to commit, returning its result.
+
+        The write runs on the shard that is current for the caller. If it
+        raises, or its commit fails, the exception is raised here. If it has
+        not finished within the timeout, concurrent.futures.TimeoutError is
+        raised and the write is dropped unless the writer already started it.
+        """
+        self.start()
+        future = futures.Future()
+        self.queue.put((unit, current_shard.get(), future))
+        try:
+            return future.result(timeout=self.timeout)
+        except futures.TimeoutError:
+            # Keep the writer from running a write its request gave up on. One
+            # already running cannot be stopped and may still commit
+            future.cancel()
+            raise
+
+    def start(self):
+        """Start the writer thread if it is not running in this process."""
+        with self.lock:
+            # Threads do not survive a fork, so pre-forked workers start their own
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self.run, name="group-commit", daemon=True)
+                self.thread.start()
+
+    def run(self):
+        """Collect queued writes into batches and commit them, forever."""
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + self.max_wait
+
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self.queue.get(timeout=max(0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+
+            # Skip writes whose requests timed out; the rest can no longer be cancelled
+            batch = [item for item in batch if item[2].set_running_or_notify_cancel()]
+
+            # Shards commit separately, so give each its own transaction to
+            # keep a failed commit on one from retrying writes done on another
+            by_shard = {}
+            for item in batch:
+                by_shard.setdefault(item[1], []).append(item)
+
+            try:
+                with self.app.app_context():
+                    for items in by_shard.values():
+                        self.commit_batch(items)
+            except Exception as error:
+                # Fail whatever the batch left unfinished rather than leave its
+                # requests waiting, and keep the writer running for the next one
+                self.app.logger.exception("Group commit batch failed")
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(error)
+
+    def commit_batch(self, batch):
+        """Run a batch of writes in one transaction.
+
+        If any write fails, the transaction is rolled back and every write is
+        retried in a transaction of its own, so only the failing request sees
+        the error.
+        """
+        try:
+            results = [self.run_unit(unit, shard) for unit, shard, _ in batch]
+            db.session.commit()
+        except Exception as error:
+            db.session.rollback()
+            if len(batch) == 1:
+                batch[0][2].set_exception(error)
+                return
+        else:
+            for (_, _, future), result in zip(batch, results):
+                future.set_result(result)
+            return
+
+        for unit, shard, future in batch:
+            try:
+                result = self.run_unit(unit, shard)
+                db.session.commit()
+            except Exception as error:
+                db.session.rollback()
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    @staticmethod
+    def run_unit(unit, shard):
+        """Run one write on the shard it was submitted from."""
+        with use_shard(shard):
+            return unit()
+
+
+def write(unit):
+    """Run a write and commit it, returning the unit's result.
+
+    unit makes its changes, flushes them and returns plain data. With group
+    commit enabled it runs on the writer thread, in another session, and is
+    committed together with other requests' writes. Inside an atomic batch
+    it is only flushed, like commit_session().
+    """
+    committer = current_app.extensions.get("group_commit")
+    if committer is None or g.get("defer_commit"):
+        result = unit()
+        commit_session()
+        return result
+
+    # Hand the request's connection back to the pool while it waits, or enough
+    # waiting requests would leave none for the writer
+    db.session.close()
+    return committer.submit(unit)
@@ -1,11 +1,38 @@
 """Main Flask application with API endpoints."""
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, abort, current_app, request, jsonify
 from flask_cors import CORS
-from app.models import db, User, Task, Category
+from werkzeug.utils import import_string
+from app.models import (
+    db,
+    User,
+    Task,
+    TaskArchive,
+    TaskTombstone,
+    Category,
+    TASK_CHOICES,
+    TASK_PRIORITIES,
+    TASK_STATUSES,
+)
 from app.config import config
-from datetime import datetime
+from app.archive import archived_counts, delete_archived_tasks, restore_task
+from app.events import format_event, publish_task_event
+from app.batch import run_batch
+from app.group_commit import GroupCommitter, write
+from app.sharding import (
+    create_shard_tables,
+    each_shard,
+    gather,
+    shard_for_user,
+    task_shard,
+    use_shard,
+    use_user_shard,
+)
+from app.utils import commit_session, page_bounds, paginate_merged, validate_json
+from datetime import datetime, timedelta, timezone
+from operator import attrgetter
 import os
+import queue
 
 
 def create_app(config_name=None):
@@ -20,9 +47,16 @@ def create_app(config_name=None):
     db.init_app(app)
     CORS(app)
 
+    broker_class = import_string(app.config["EVENT_BROKER"])
+    app.extensions["event_broker"] = broker_class.from_config(app.config)
+
+    if app.config["GROUP_COMMIT"]:
+        app.extensions["group_commit"] = GroupCommitter.from_config(app)
+
     # Create database tables
     with app.app_context():
         db.create_all()
+        create_shard_tables()
 
     # Register routes
     register_routes(app)
@@ -30,6 +64,29 @@ def create_app(config_name=None):
     return app
 
 
+def sync_cursor(newest=None):
+    """Sync cursor to continue from after seeing changes up to newest.
+
+    Timestamps are taken before a write waits for its commit, so writes can
+    commit out of timestamp order. The cursor therefore never passes
+    SYNC_CURSOR_LAG_SECONDS ago, and the next sync returns the changes since
+    then again rather than skipping one that committed late.
+    """
+    lag = timedelta(seconds=current_app.config["SYNC_CURSOR_LAG_SECONDS"])
+    settled = datetime.utcnow() - lag
+    return min(newest, settled) if newest else settled
+
+
+def bury_tasks(tasks):
+    """Record tombstones for tasks about to be deleted and purge expired ones."""
+    now = datetime.utcnow()
+    for task in tasks:
+        db.session.add(TaskTombstone(task_id=task.id, user_id=task.user_id, deleted_at=now))
+
+    cutoff = now - timedelta(days=current_app.config["TOMBSTONE_RETENTION_DAYS"])
+    TaskTombstone.query.filter(TaskTombstone.deleted_at < cutoff).delete()
+
+
 def register_routes(app):
     """Register all API endpoints."""
 
@@ -44,8 +101,11 @@ def register_routes(app):
                     "health": "/health",
                     "users": "/api/users",
                     "tasks": "/api/tasks",
+                    "task_changes": "/api/tasks/changes",
+                    "task_stream": "/api/tasks/stream",
                     "categories": "/api/categories",
                     "statistics": "/api/stats",
+                    "batch": "/api/batch",
                 },
             }
         )
@@ -61,7 +121,11 @@ def register_routes(app):
     def get_users():
         """Get all users."""
         users = User.query.all()
-        return jsonify([user.to_dict() for user in users])
+        result = []
+        for user in users:
+            with use_user_shard(user.id):
+                result.append(user.to_dict())
+        return jsonify(result)
 
     @app.route("/api/users", methods=["POST"])
     def create_user():
@@ -78,48 +142,87 @@ def register_routes(app):
         if User.query.filter_by(email=data["email"]).first():
             return jsonify({"error": "Email already exists"}), 400
 
-        user = User(username=data["username"], email=data["email"])
-        db.session.add(user)
-        db.session.commit()
+        def add_user():
+            user = User(username=data["username"], email=data["email"])
+            db.session.add(user)
+            db.session.flush()
+            with use_user_shard(user.id):
+                return user.to_dict()
 
-        return jsonify(user.to_dict()), 201
+        return jsonify(write(add_user)), 201
 
     @app.route("/api/users/<int:user_id>", methods=["GET"])
     def get_user(user_id):
         """Get a specific user by ID."""
         user = User.query.get_or_404(user_id)
-        return jsonify(user.to_dict())
+        with use_user_shard(user_id):
+            return jsonify(user.to_dict())
 
     @app.route("/api/users/<int:user_id>", methods=["DELETE"])
     def delete_user(user_id):
         """Delete a user."""
         user = User.query.get_or_404(user_id)
-        db.session.delete(user)
-        db.session.commit()
+        with use_user_shard(user_id):
+            archived = TaskArchive.query.filter_by(user_id=user_id).all()
+            deleted = [task.to_dict() for task in user.tasks + archived]
+            bury_tasks(user.tasks + archived)
+            delete_archived_tasks(archived)
+            db.session.delete(user)
+            commit_session()
+
+        cursor = sync_cursor().isoformat()
+        for task in deleted:
+            publish_task_event("task.deleted", task, cursor)
+
         return jsonify({"message": "User deleted successfully"}), 200
 
     # ========== TASK ENDPOINTS ==========
 
     @app.route("/api/tasks", methods=["GET"])
     def get_tasks():
-        """Get all tasks with optional filtering."""
+        """Get all tasks with optional filtering, oldest first.
+
+        Pass page (and optionally per_page) to get one page of the results.
+        """
         status = request.args.get("status")
         priority = request.args.get("priority")
         user_id = request.args.get("user_id", type=int)
+        page = request.args.get("page", type=int)
 
-        query = Task.query
+        for field, value in (("status", status), ("priority", priority)):
+            if value and value not in TASK_CHOICES[field]:
+                return jsonify({"error": f"Invalid {field} filter"}), 400
 
-        if status:
-            query = query.filter_by(status=status)
-        if priority:
-            query = query.filter_by(priority=priority)
-        if user_id:
-            query = query.filter_by(user_id=user_id)
+        models = [Task]
+        if request.args.get("include_archived", "").lower() == "true":
+            models.append(TaskArchive)
+
+        queries = []
+        for model in models:
+            query = model.query
+            if status:
+                query = query.filter_by(status=status)
+            if priority:
+                query = query.filter_by(priority=priority)
+            if user_id:
+                query = query.filter_by(user_id=user_id)
+
+            queries.append(query.order_by(model.created_at, model.id))
 
-        tasks = query.all()
-        return jsonify([task.to_dict() for task in tasks])
+        # A user's tasks are on one shard, everything else is gathered from all of them
+        shards = [shard_for_user(user_id)] if user_id else None
+        order = attrgetter("created_at", "id")
+
+        if page is None:
+            return jsonify([task.to_dict() for task in gather(queries, order, shards=shards)])
+
+        page, per_page = page_bounds(page, request.args.get("per_page", 20, type=int))
+        tasks = gather(queries, order, limit=page * per_page, shards=shards)
+        total = sum(query.order_by(None).count() for _ in each_shard(shards) for query in queries)
+        return jsonify(paginate_merged(tasks, total, page, per_page))
 
     @app.route("/api/tasks", methods=["POST"])
+    @validate_json(choices=TASK_CHOICES)
     def create_task():
         """Create a new task."""
         data = request.get_json()
@@ -132,62 +235,173 @@ def register_routes(app):
         if not user:
             return jsonify({"error": "User not found"}), 404
 
-        task = Task(
-            title=data["title"],
-            description=data.get("description", ""),
-            status=data.get("status", "pending"),
-            priority=data.get("priority", "medium"),
-            user_id=data["user_id"],
-        )
-
+        due_date = None
         if data.get("due_date"):
             try:
-                task.due_date = datetime.fromisoformat(data["due_date"])
+                due_date = datetime.fromisoformat(data["due_date"])
             except ValueError:
                 return jsonify({"error": "Invalid due_date format"}), 400
 
-        db.session.add(task)
-        db.session.commit()
+        def add_task():
+            task = Task(
+                title=data["title"],
+                description=data.get("description", ""),
+                status=data.get("status", "pending"),
+                priority=data.get("priority", "medium"),
+                due_date=due_date,
+                user_id=data["user_id"],
+            )
+            db.session.add(task)
+            db.session.flush()
+            return task.to_dict()
+
+        with use_user_shard(user.id):
+            payload = write(add_task)
+
+        publish_task_event("task.created", payload, sync_cursor().isoformat())
+        return jsonify(payload), 201
+
+    @app.route("/api/tasks/changes", methods=["GET"])
+    def get_task_changes():
+        """Get tasks created, updated or deleted after a sync cursor."""
+        since = request.args.get("since")
+        user_id = request.args.get("user_id", type=int)
+
+        tasks = Task.query.order_by(Task.updated_at)
+        tombstones = TaskTombstone.query.order_by(TaskTombstone.deleted_at)
+
+        if since:
+            try:
+                since = datetime.fromisoformat(since)
+            except ValueError:
+                return jsonify({"error": "Invalid since cursor"}), 400
+            # Timestamps are stored as naive UTC
+            if since.tzinfo is not None:
+                since = since.astimezone(timezone.utc).replace(tzinfo=None)
+
+            retention = timedelta(days=app.config["TOMBSTONE_RETENTION_DAYS"])
+            if since < datetime.utcnow() - retention:
+                return jsonify({"error": "Cursor expired, perform a full sync"}), 410
+
+            tasks = tasks.filter(Task.updated_at > since)
+            tombstones = tombstones.filter(TaskTombstone.deleted_at > since)
+
+        shards = None
+        if user_id:
+            tasks = tasks.filter_by(user_id=user_id)
+            tombstones = tombstones.filter_by(user_id=user_id)
+            shards = [shard_for_user(user_id)]
+
+        tasks = gather([tasks], attrgetter("updated_at"), shards=shards)
+        # Without a cursor the client is doing a full sync and has nothing to delete
+        if since:
+            tombstones = gather([tombstones], attrgetter("deleted_at"), shards=shards)
+        else:
+            tombstones = []
+
+        # The new cursor comes from the changes returned rather than the client's
+        # clock, so clock skew between the two cannot make the next sync skip anything
+        timestamps = [task.updated_at for task in tasks]
+        timestamps += [tombstone.deleted_at for tombstone in tombstones]
+        cursor = sync_cursor(max(timestamps) if timestamps else since)
+
+        return jsonify(
+            {
+                "tasks": [task.to_dict() for task in tasks],
+                "deleted": [tombstone.to_dict() for tombstone in tombstones],
+                "cursor": cursor.isoformat(),
+            }
+        )
 
-        return jsonify(task.to_dict()), 201
+    @app.route("/api/tasks/stream", methods=["GET"])
+    def stream_tasks():
+        """Stream task changes as Server-Sent Events."""
+        subscription = app.extensions["event_broker"].subscribe(
+            user_id=request.args.get("user_id", type=int),
+            status=request.args.get("status"),
+        )
+        heartbeat = app.config["EVENT_HEARTBEAT_SECONDS"]
+
+        def generate():
+            try:
+                yield ": connected\n\n"
+                while True:
+                    try:
+                        event = subscription.get(timeout=heartbeat)
+                    except queue.Empty:
+                        yield ": keep-alive\n\n"
+                        continue
+
+                    yield format_event(event)
+                    if event is None:
+                        return
+            finally:
+                app.extensions["event_broker"].unsubscribe(subscription)
+
+        return Response(
+            generate(),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
 
     @app.route("/api/tasks/<int:task_id>", methods=["GET"])
     def get_task(task_id):
-        """Get a specific task by ID."""
-        task = Task.query.get_or_404(task_id)
-        return jsonify(task.to_dict())
+        """Get a specific task by ID, reading through to the archive."""
+        with use_shard(task_shard(task_id, Task, TaskArchive)):
+            task = Task.query.get(task_id) or TaskArchive.query.get_or_404(task_id)
+            return jsonify(task.to_dict())
 
     @app.route("/api/tasks/<int:task_id>", methods=["PUT"])
+    @validate_json(choices=TASK_CHOICES)
     def update_task(task_id):
-        """Update a task."""
-        task = Task.query.get_or_404(task_id)
+        """Update a task; updating an archived task moves it back to the live table."""
         data = request.get_json()
 
-        if "title" in data:
-            task.title = data["title"]
-        if "description" in data:
-            task.description = data["description"]
-        if "status" in data:
-            task.status = data["status"]
-        if "priority" in data:
-            task.priority = data["priority"]
+        changes = {
+            field: data[field]
+            for field in ("title", "description", "status", "priority")
+            if field in data
+        }
         if "due_date" in data:
             try:
-                task.due_date = datetime.fromisoformat(data["due_date"])
+                changes["due_date"] = datetime.fromisoformat(data["due_date"])
             except ValueError:
                 return jsonify({"error": "Invalid due_date format"}), 400
 
-        task.updated_at = datetime.utcnow()
-        db.session.commit()
+        def apply_changes():
+            task = Task.query.get(task_id) or restore_task(task_id)
+            if task is None:
+                return None, None
 
-        return jsonify(task.to_dict())
+            previous_status = task.status
+            for field, value in changes.items():
+                setattr(task, field, value)
+            task.updated_at = datetime.utcnow()
+            db.session.flush()
+            return task.to_dict(), previous_status
+
+        with use_shard(task_shard(task_id, Task, TaskArchive)):
+            payload, previous_status = write(apply_changes)
+        if payload is None:
+            abort(404)
+
+        publish_task_event("task.updated", payload, sync_cursor().isoformat(), previous_status)
+        return jsonify(payload)
 
     @app.route("/api/tasks/<int:task_id>", methods=["DELETE"])
     def delete_task(task_id):
         """Delete a task."""
-        task = Task.query.get_or_404(task_id)
-        db.session.delete(task)
-        db.session.commit()
+        with use_shard(task_shard(task_id, Task, TaskArchive)):
+            task = Task.query.get(task_id) or TaskArchive.query.get_or_404(task_id)
+            deleted = task.to_dict()
+            bury_tasks([task])
+            if isinstance(task, TaskArchive):
+                delete_archived_tasks([task])
+            else:
+                db.session.delete(task)
+            commit_session()
+
+        publish_task_event("task.deleted", deleted, sync_cursor().isoformat())
         return jsonify({"message": "Task deleted successfully"}), 200
 
     # ========== CATEGORY ENDPOINTS ==========
@@ -209,11 +423,13 @@ def register_routes(app):
         if Category.query.filter_by(name=data["name"]).first():
             return jsonify({"error": "Category already exists"}), 400
 
-        category = Category(name=data["name"], description=data.get("description", ""))
-        db.session.add(category)
-        db.session.commit()
+        def add_category():
+            category = Category(name=data["name"], description=data.get("description", ""))
+            db.session.add(category)
+            db.session.flush()
+            return category.to_dict()
 
-        return jsonify(category.to_dict()), 201
+        return jsonify(write(add_category)), 201
 
     # ========== STATISTICS ENDPOINT ==========
 
@@ -221,20 +437,26 @@ def register_routes(app):
     def get_statistics():
         """Get application statistics."""
         total_users = User.query.count()
-        total_tasks = Task.query.count()
         total_categories = Category.query.count()
 
-        task_stats = {
-            "pending": Task.query.filter_by(status="pending").count(),
-            "in_progress": Task.query.filter_by(status="in_progress").count(),
-            "completed": Task.query.filter_by(status="completed").count(),
-        }
+        total_tasks = 0
+        task_stats = dict.fromkeys(TASK_STATUSES, 0)
+        priority_stats = dict.fromkeys(TASK_PRIORITIES, 0)
 
-        priority_stats = {
-            "low": Task.query.filter_by(priority="low").count(),
-            "medium": Task.query.filter_by(priority="medium").count(),
-            "high": Task.query.filter_by(priority="high").count(),
-        }
+        for _ in each_shard():
+            total_tasks += Task.query.count()
+
+            for status in TASK_STATUSES:
+                task_stats[status] += Task.query.filter_by(status=status).count()
+
+            for priority in TASK_PRIORITIES:
+                priority_stats[priority] += Task.query.filter_by(priority=priority).count()
+
+            # Archived tasks are counted as they move, not by scanning the archive
+            for (status, priority), count in archived_counts().items():
+                total_tasks += count
+                task_stats[status] += count
+                priority_stats[priority] += count
 
         return jsonify(
             {
@@ -246,6 +468,33 @@ def register_routes(app):
             }
         )
 
+    # ========== BATCH ENDPOINT ==========
+
+    @app.route("/api/batch", methods=["POST"])
+    @validate_json(["requests"])
+    def batch():
+        """Run several API requests in one round-trip."""
+        data = request.get_json()
+        sub_requests = data["requests"]
+
+        if not isinstance(sub_requests, list) or not sub_requests:
+            return jsonify({"error": "requests must be a non-empty list"}), 400
+
+        max_requests = app.config["BATCH_MAX_REQUESTS"]
+        if len(sub_requests) > max_requests:
+            return jsonify({"error": f"A batch can contain at most {max_requests} requests"}), 400
+
+        atomic = data.get("atomic", False)
+        if not isinstance(atomic, bool):
+            return jsonify({"error": "atomic must be true or false"}), 400
+
+        responses, committed = run_batch(app, sub_requests, atomic=atomic)
+
+        result = {"responses": responses}
+        if atomic:
+            result["committed"] = committed
+        return jsonify(result)
+
     # Error handlers
     @app.errorhandler(404)
     def not_found(error):
@@ -259,8 +508,15 @@ def register_routes(app):
         return jsonify({"error": "Internal server error"}), 500
 
 
-# Create the application instance
-app = create_app()
+def __getattr__(name):
+    # Create the application instance on first use, so importing create_app
+    # (as app.serve does in its master process) does not build a second app
+    if name == "app":
+        global app
+        app = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=5000, debug=True)
+    create_app().run(host="0.0.0.0", port=5000, debug=True)
@@ -1,9 +1,78 @@
 """Database models for the Flask application."""
 
+from contextvars import ContextVar
 from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
+from sqlalchemy.sql.util import find_tables
 
-db = SQLAlchemy()
+# Tables split across the task shards; every other table lives in the main database
+SHARDED_TABLES = frozenset(
+    {"tasks", "tasks_archive", "task_archive_counts", "task_tombstones", "task_id_counter"}
+)
+
+# Shard the sharded tables are read from and written to in the current context
+current_shard = ContextVar("current_shard", default=0)
+
+
+class ShardedSession(Session):
+    """Session sending queries on the sharded tables to the current shard.
+
+    Shard 0 is the main database, shard N is the "shardN" bind.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        shard = current_shard.get()
+        if bind is None and shard and uses_sharded_table(mapper, clause):
+            return self._db.engines[f"shard{shard}"]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def uses_sharded_table(mapper, clause):
+    """Check whether a mapper or statement reads or writes a sharded table."""
+    if mapper is not None:
+        return mapper.local_table.name in SHARDED_TABLES
+    if clause is not None:
+        return any(table.name in SHARDED_TABLES for table in find_tables(clause, include_crud=True))
+    return False
+
+
+db = SQLAlchemy(session_options={"class_": ShardedSession})
+
+TASK_STATUSES = ("pending", "in_progress", "completed")
+TASK_PRIORITIES = ("low", "medium", "high")
+
+# Allowed values of the enum fields in task requests
+TASK_CHOICES = {"status": TASK_STATUSES, "priority": TASK_PRIORITIES}
+
+
+class ChoiceType(db.TypeDecorator):
+    """Column type storing one of a fixed set of strings as its small-integer index.
+
+    Python code keeps reading and writing the strings, including in query
+    filters, while rows and indexes only carry the integer.
+    """
+
+    impl = db.SmallInteger
+    cache_ok = True
+
+    def __init__(self, choices):
+        super().__init__()
+        self.choices = tuple(choices)
+        self._codes = {choice: code for code, choice in enumerate(self.choices)}
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        try:
+            return self._codes[value]
+        except KeyError:
+            raise ValueError(f"{value!r} is not one of {', '.join(self.choices)}") from None
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return self.choices[value]
 
 
 class User(db.Model):
@@ -17,31 +86,49 @@ class User(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     tasks = db.relationship("Task", backref="owner", lazy=True, cascade="all, delete-orphan")
 
-    def to_dict(self):
-        """Convert user object to dictionary."""
+    def to_dict(self, archived_count=None):
+        """Convert user object to dictionary.
+
+        task_count includes archived tasks, counted on the current shard unless
+        archived_count is given.
+        """
+        if archived_count is None:
+            archived_count = db.session.scalar(
+                db.select(db.func.count()).where(TaskArchive.user_id == self.id)
+            )
         return {
             "id": self.id,
             "username": self.username,
             "email": self.email,
             "created_at": self.created_at.isoformat(),
-            "task_count": len(self.tasks),
+            "task_count": len(self.tasks) + archived_count,
         }
 
 
-class Task(db.Model):
-    """Task model for managing user tasks."""
-
-    __tablename__ = "tasks"
+class TaskFields:
+    """Columns and serialization shared by live and archived tasks."""
 
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text)
-    status = db.Column(db.String(20), default="pending")  # pending, in_progress, completed
-    priority = db.Column(db.String(20), default="medium")  # low, medium, high
+    status = db.Column(ChoiceType(TASK_STATUSES), default="pending")
+    priority = db.Column(ChoiceType(TASK_PRIORITIES), default="medium")
     due_date = db.Column(db.DateTime, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+
+    # Columns copied as-is when a task moves between the live and archive tables
+    COPIED_COLUMNS = (
+        "id",
+        "title",
+        "description",
+        "status",
+        "priority",
+        "due_date",
+        "created_at",
+        "updated_at",
+        "user_id",
+    )
 
     def to_dict(self):
         """Convert task object to dictionary."""
@@ -58,6 +145,109 @@ class Task(db.Model):
         }
 
 
+class Task(TaskFields, db.Model):
+    """Task model for managing user tasks."""
+
+    __tablename__ = "tasks"
+
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+
+    __table_args__ = (
+        db.Index("ix_tasks_updated_at", "updated_at"),
+        db.Index("ix_tasks_user_id_updated_at", "user_id", "updated_at"),
+        # Lets the archiver find old completed tasks without a table scan
+        db.Index("ix_tasks_status_updated_at", "status", "updated_at"),
+        db.CheckConstraint(
+            f"status BETWEEN 0 AND {len(TASK_STATUSES) - 1}", name="ck_tasks_status"
+        ),
+        db.CheckConstraint(
+            f"priority BETWEEN 0 AND {len(TASK_PRIORITIES) - 1}", name="ck_tasks_priority"
+        ),
+        # Never reuse the ID of a task that was moved to the archive
+        {"sqlite_autoincrement": True},
+    )
+
+
+class TaskArchive(TaskFields, db.Model):
+    """Completed task moved out of the live tasks table."""
+
+    __tablename__ = "tasks_archive"
+
+    user_id = db.Column(db.Integer, nullable=False, index=True)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.CheckConstraint(
+            f"status BETWEEN 0 AND {len(TASK_STATUSES) - 1}", name="ck_tasks_archive_status"
+        ),
+        db.CheckConstraint(
+            f"priority BETWEEN 0 AND {len(TASK_PRIORITIES) - 1}",
+            name="ck_tasks_archive_priority",
+        ),
+    )
+
+    def to_dict(self):
+        """Convert archived task object to dictionary."""
+        return {**super().to_dict(), "archived": True}
+
+
+class TaskArchiveCount(db.Model):
+    """Number of archived tasks with a status and priority on a shard.
+
+    Every change to tasks_archive updates these rows, so statistics read a
+    handful of them instead of scanning the archive.
+    """
+
+    __tablename__ = "task_archive_counts"
+
+    status = db.Column(ChoiceType(TASK_STATUSES), primary_key=True)
+    priority = db.Column(ChoiceType(TASK_PRIORITIES), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    @classmethod
+    def adjust(cls, counts, sign=1):
+        """Add counts, mapping (status, priority) to a number of tasks, in the session."""
+        for (status, priority), count in counts.items():
+            key = (cls.status == status, cls.priority == priority)
+            result = db.session.execute(
+                db.update(cls).where(*key).values(count=cls.count + sign * count)
+            )
+            if not result.rowcount:
+                db.session.execute(
+                    db.insert(cls).values(status=status, priority=priority, count=sign * count)
+                )
+
+
+class TaskTombstone(db.Model):
+    """Marker left behind by a deleted task so sync clients can drop it."""
+
+    __tablename__ = "task_tombstones"
+
+    id = db.Column(db.Integer, primary_key=True)
+    task_id = db.Column(db.Integer, nullable=False)
+    user_id = db.Column(db.Integer, nullable=False)
+    deleted_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    __table_args__ = (db.Index("ix_task_tombstones_user_id_deleted_at", "user_id", "deleted_at"),)
+
+    def to_dict(self):
+        """Convert tombstone object to dictionary."""
+        return {
+            "id": self.task_id,
+            "user_id": self.user_id,
+            "deleted_at": self.deleted_at.isoformat(),
+        }
+
+
+class TaskIdCounter(db.Model):
+    """Next task ID to hand out on a shard, kept in the shard's own database."""
+
+    __tablename__ = "task_id_counter"
+
+    id = db.Column(db.Integer, primary_key=True)
+    next_id = db.Column(db.Integer, nullable=False)
+
+
 class Category(db.Model):
     """Category model for organizing tasks."""
 
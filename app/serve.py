@@ -0,0 +1,124 @@
+"""Production server: the Flask app behind pre-forked gunicorn workers.
+
+The app is loaded once in the master process and forked into the workers,
+each of which gets fresh database connections. Workers are threaded
+(gthread), so a long-lived /api/tasks/stream response does not trip the
+worker timeout. Workers are recycled after a number of requests, and
+SIGHUP replaces them all gracefully.
+
+Usage:
+    python -m app.serve --bind 0.0.0.0:8000 --workers 4
+"""
+
+import argparse
+import logging
+import os
+from gunicorn.app.base import BaseApplication
+from app.events import InProcessBroker
+from app.models import db
+
+
+def post_fork(server, worker):
+    """Drop database connections inherited from the master process."""
+    app = server.app.wsgi()
+    with app.app_context():
+        for engine in db.engines.values():
+            # close=False leaves the master's connections alone, the worker
+            # just stops using them and opens its own
+            engine.dispose(close=False)
+
+
+def event_broker_warning(app, workers):
+    """Explain why event streams would miss events with this many workers."""
+    if workers > 1 and isinstance(app.extensions["event_broker"], InProcessBroker):
+        return (
+            f"Running {workers} workers with InProcessBroker: /api/tasks/stream only sees "
+            "writes handled by its own worker. Set EVENT_BROKER to a broker shared between "
+            "processes, or run one worker"
+        )
+    return None
+
+
+def build_options(args):
+    """Build gunicorn settings from the command line arguments."""
+    return {
+        "bind": args.bind,
+        "workers": args.workers,
+        # Sync workers are killed when a response outlives the timeout, which
+        # every event stream does; gthread workers keep heartbeating meanwhile
+        "worker_class": "gthread",
+        "threads": args.threads,
+        "preload_app": True,
+        "max_requests": args.max_requests,
+        "max_requests_jitter": args.max_requests_jitter,
+        "graceful_timeout": args.graceful_timeout,
+        "timeout": args.timeout,
+        "post_fork": post_fork,
+        "accesslog": "-",
+    }
+
+
+class TaskManagerServer(BaseApplication):
+    """Gunicorn application that serves the Flask app."""
+
+    def __init__(self, options, config_name=None):
+        self.options = options
+        self.config_name = config_name
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        from app.main import create_app
+
+        app = create_app(self.config_name)
+        warning = event_broker_warning(app, self.cfg.workers)
+        if warning:
+            logging.getLogger("gunicorn.error").warning(warning)
+        return app
+
+
+def parse_args(argv=None):
+    """Parse the serve command's arguments."""
+    parser = argparse.ArgumentParser(description="Run the API with pre-forked workers.")
+    parser.add_argument("--bind", default=os.getenv("SERVER_BIND", "0.0.0.0:8000"))
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1)),
+        help="number of worker processes (default: number of cores)",
+    )
+    parser.add_argument(
+        "--threads",
+        type=int,
+        default=int(os.getenv("SERVER_THREADS", "4")),
+        help="threads per worker, each open /api/tasks/stream holds one (default: 4)",
+    )
+    parser.add_argument(
+        "--max-requests",
+        type=int,
+        default=int(os.getenv("SERVER_MAX_REQUESTS", "1000")),
+        help="restart a worker after this many requests (0 disables)",
+    )
+    parser.add_argument("--max-requests-jitter", type=int, default=50)
+    parser.add_argument("--graceful-timeout", type=int, default=30)
+    parser.add_argument("--timeout", type=int, default=30)
+    parser.add_argument(
+        "--config",
+        dest="config_name",
+        default="production",
+        choices=["development", "production", "testing"],
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Run the production server."""
+    args = parse_args(argv)
+    TaskManagerServer(build_options(args), config_name=args.config_name).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+"""Splitting task data across several databases by user.
+
+Each user's tasks, archived tasks and tombstones live on one shard, picked
+from the user ID with a jump consistent hash, so user-scoped requests touch
+a single database and writes to different shards do not wait on each
+other. Users and categories always stay in the main database, which is
+also shard 0.
+"""
+
+import heapq
+from collections import Counter
+from contextlib import contextmanager
+from itertools import islice
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from app.models import (
+    db,
+    current_shard,
+    Task,
+    TaskArchive,
+    TaskArchiveCount,
+    TaskTombstone,
+    TaskIdCounter,
+    SHARDED_TABLES,
+)
+
+# Task IDs handed out by shard N start at N << SHARD_ID_BITS, so they are
+# unique across shards and a task's ID tells where it was created
+SHARD_ID_BITS = 40
+
+# Rows deleted per statement when resharding, to stay under bound parameter limits
+MOVE_CHUNK_SIZE = 500
+
+
+def jump_hash(key, buckets):
+    """Map an integer key to one of buckets (Lamping and Veach's jump hash).
+
+    Growing from N to N + 1 buckets only moves 1 / (N + 1) of the keys, all
+    of them to the new bucket.
+    """
+    bucket, jump = -1, 0
+    while jump < buckets:
+        bucket = jump
+        key = (key * 2862933555777941757 + 1) & 0xFFFFFFFFFFFFFFFF
+        jump = int((bucket + 1) * ((1 << 31) / ((key >> 33) + 1)))
+    return bucket
+
+
+def shard_count():
+    """Number of shards tasks are spread over."""
+    return current_app.config["TASK_SHARDS"]
+
+
+def shard_for_user(user_id, shards=None):
+    """Get the shard holding a user's tasks."""
+    return jump_hash(user_id, shards or shard_count())
+
+
+@contextmanager
+def use_shard(shard):
+    """Send queries on the task tables to one shard."""
+    token = current_shard.set(shard)
+    try:
+        yield shard
+    finally:
+        current_shard.reset(token)
+
+
+def use_user_shard(user_id):
+    """Send queries on the task tables to a user's shard."""
+    return use_shard(shard_for_user(user_id))
+
+
+def each_shard(shards=None):
+    """Switch to each shard in turn, all of them by default."""
+    for shard in range(shard_count()) if shards is None else shards:
+        with use_shard(shard):
+            yield shard
+
+
+def task_shard(task_id, *models):
+    """Find the shard holding a task stored in one of models.
+
+    The shard that handed out the ID is tried first; a task is only found
+    elsewhere after a reshard moved its owner. Falls back to that shard when
+    no shard has the task, so the caller's lookup reports it missing.
+    """
+    shards = shard_count()
+    home = min(task_id >> SHARD_ID_BITS, shards - 1)
+    if shards == 1:
+        return home
+
+    for shard in each_shard([home, *(shard for shard in range(shards) if shard != home)]):
+        for model in models:
+            if db.session.scalar(db.select(model.id).filter_by(id=task_id)) is not None:
+                return shard
+    return home
+
+
+def gather(queries, key, limit=None, shards=None):
+    """Run queries on each shard and merge their rows.
+
+    Every query must already be ordered by key, so the merge only compares
+    the heads of the per-shard results. With a limit, each query returns at
+    most that many rows.
+    """
+    results = []
+    for _ in each_shard(shards):
+        for query in queries:
+            results.append((query.limit(limit) if limit else query).all())
+    return list(islice(heapq.merge(*results, key=key), limit))
+
+
+def sharded_tables():
+    """Tables that live on every shard."""
+    return [db.metadata.tables[name] for name in SHARDED_TABLES]
+
+
+def shard_engines():
+    """Engines of the shards other than the main database, by shard number."""
+    shards = max(shard_count(), current_app.config["RESHARD_FROM"])
+    return {shard: db.engines[f"shard{shard}"] for shard in range(1, shards)}
+
+
+def create_shard_tables():
+    """Create the task tables on every shard and start their ID counters."""
+    for engine in shard_engines().values():
+        db.metadata.create_all(engine, tables=sharded_tables())
+
+    if shard_count() > 1:
+        start_task_id_counters()
+
+
+def drop_shard_tables():
+    """Drop the task tables from every shard but the main database."""
+    for engine in shard_engines().values():
+        db.metadata.drop_all(engine, tables=sharded_tables())
+
+
+def task_id_range(shard):
+    """IDs a shard hands out to new tasks, as a (start, stop) range."""
+    return max(shard << SHARD_ID_BITS, 1), (shard + 1) << SHARD_ID_BITS
+
+
+def highest_task_id(executor, shard):
+    """Highest ID from a shard's range used by any task seen by executor."""
+    start, stop = task_id_range(shard)
+    highest = start - 1
+    for column in (Task.id, TaskArchive.id, TaskTombstone.task_id):
+        value = executor.scalar(
+            db.select(db.func.max(column)).where(column >= start, column < stop)
+        )
+        highest = max(highest, value or highest)
+    return highest
+
+
+def start_task_id_counters():
+    """Create missing ID counters, continuing after IDs used on any shard."""
+    shards = range(max(shard_count(), current_app.config["RESHARD_FROM"]))
+    for shard in shards:
+        with use_shard(shard):
+            if db.session.get(TaskIdCounter, 1) is not None:
+                continue
+
+        # Resharding moves tasks with their IDs, so look at every shard
+        highest = max(highest_task_id(db.session, shard) for _ in each_shard(shards))
+        with use_shard(shard):
+            db.session.add(TaskIdCounter(id=1, next_id=highest + 1))
+            try:
+                db.session.commit()
+            except IntegrityError:
+                # Another process starting at the same time got there first
+                db.session.rollback()
+
+
+def next_task_id(connection, shard):
+    """Take the next task ID from a shard's counter."""
+    counter = TaskIdCounter.__table__
+    result = connection.execute(counter.update().values(next_id=counter.c.next_id + 1))
+    if result.rowcount:
+        return connection.scalar(db.select(counter.c.next_id)) - 1
+
+    # The tables were recreated since startup, carry on from this shard's rows
+    task_id = highest_task_id(connection, shard) + 1
+    connection.execute(counter.insert().values(id=1, next_id=task_id + 1))
+    return task_id
+
+
+@db.event.listens_for(Task, "before_insert")
+def assign_task_id(mapper, connection, task):
+    """Give a new task an ID from its shard's range when tasks are sharded."""
+    if task.id is None and shard_count() > 1:
+        task.id = next_task_id(connection, current_shard.get())
+
+
+def reshard_tasks(previous_shards):
+    """Move every user's tasks to their shard under the current shard count.
+
+    Rows are copied to the new shard before they are deleted from the old
+    one, and rows the new shard already has are skipped, so an interrupted
+    run can simply be repeated. Writes to tasks must be stopped while it
+    runs: a change made to a row after it was copied is lost when the
+    original is deleted. Returns the number of users moved.
+    """
+    moved = 0
+    for source in range(max(previous_shards, shard_count())):
+        with use_shard(source):
+            user_ids = set()
+            for model in (Task, TaskArchive, TaskTombstone):
+                user_ids.update(db.session.scalars(db.select(model.user_id).distinct()))
+
+        for user_id in sorted(user_ids):
+            target = shard_for_user(user_id)
+            if target != source:
+                move_user_tasks(user_id, source, target)
+                moved += 1
+
+    return moved
+
+
+def move_user_tasks(user_id, source, target):
+    """Copy a user's task rows from one shard to another, then delete the originals."""
+    tables = (Task.__table__, TaskArchive.__table__, TaskTombstone.__table__)
+
+    with use_shard(source):
+        rows = {
+            table: db.session.execute(db.select(table).filter_by(user_id=user_id)).mappings().all()
+            for table in tables
+        }
+
+    with use_shard(target):
+        for table, table_rows in rows.items():
+            # Tombstones get new IDs, tasks keep theirs
+            key = "task_id" if table is TaskTombstone.__table__ else "id"
+            existing = set(db.session.scalars(db.select(table.c[key]).filter_by(user_id=user_id)))
+            new_rows = [dict(row) for row in table_rows if row[key] not in existing]
+            if key == "task_id":
+                for row in new_rows:
+                    del row["id"]
+            if new_rows:
+                db.session.execute(db.insert(table), new_rows)
+            if table is TaskArchive.__table__:
+                TaskArchiveCount.adjust(archive_counts(new_rows))
+        db.session.commit()
+
+    # Delete only the rows that were copied; anything written for the user since
+    # stays on the old shard rather than being lost
+    with use_shard(source):
+        for table, table_rows in rows.items():
+            ids = [row["id"] for row in table_rows]
+            for start in range(0, len(ids), MOVE_CHUNK_SIZE):
+                chunk = ids[start : start + MOVE_CHUNK_SIZE]
+                db.session.execute(db.delete(table).where(table.c.id.in_(chunk)))
+        TaskArchiveCount.adjust(archive_counts(rows[TaskArchive.__table__]), sign=-1)
+        db.session.commit()
+
+
+def archive_counts(rows):
+    """Count archived task rows by (status, priority)."""
+    return Counter((row["status"], row["priority"]) for row in rows)
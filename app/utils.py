@@ -1,17 +1,29 @@
 """Utility functions for the Flask application."""
 
 from functools import wraps
-from flask import request, jsonify
+from math import ceil
+from flask import g, request, jsonify
+from app.models import db
 
 
-def validate_json(required_fields):
-    """Decorator to validate required JSON fields in request."""
+def validate_json(required_fields=(), choices=None):
+    """Decorator to validate required JSON fields and enum values in request.
+
+    choices maps a field to its allowed values. The checks are built once,
+    when the route is decorated, not on every request.
+    """
+    required_fields = tuple(required_fields)
+    allowed = {field: frozenset(values) for field, values in (choices or {}).items()}
+    invalid_errors = {
+        field: f"Invalid {field}, must be one of: {', '.join(values)}"
+        for field, values in (choices or {}).items()
+    }
 
     def decorator(f):
         @wraps(f)
         def wrapped(*args, **kwargs):
-            data = request.get_json()
-            if not data:
+            data = request.get_json(silent=True)
+            if not isinstance(data, dict):
                 return jsonify({"error": "Request must be JSON"}), 400
 
             missing_fields = [field for field in required_fields if field not in data]
@@ -21,6 +33,10 @@ def validate_json(required_fields):
                     400,
                 )
 
+            for field, values in allowed.items():
+                if field in data and not (isinstance(data[field], str) and data[field] in values):
+                    return jsonify({"error": invalid_errors[field]}), 400
+
             return f(*args, **kwargs)
 
         return wrapped
@@ -28,10 +44,14 @@ def validate_json(required_fields):
     return decorator
 
 
+def page_bounds(page=1, per_page=20):
+    """Clamp pagination arguments to a valid page and page size."""
+    return max(1, page), min(100, max(1, per_page))
+
+
 def paginate_query(query, page=1, per_page=20):
     """Paginate a SQLAlchemy query."""
-    page = max(1, page)
-    per_page = min(100, max(1, per_page))
+    page, per_page = page_bounds(page, per_page)
 
     paginated = query.paginate(page=page, per_page=per_page, error_out=False)
 
@@ -42,3 +62,25 @@ def paginate_query(query, page=1, per_page=20):
         "per_page": per_page,
         "pages": paginated.pages,
     }
+
+
+def paginate_merged(items, total, page, per_page):
+    """Paginate rows merged from several queries.
+
+    items holds the merged rows up to at least the end of the requested page.
+    """
+    return {
+        "items": [item.to_dict() for item in items[(page - 1) * per_page : page * per_page]],
+        "total": total,
+        "page": page,
+        "per_page": per_page,
+        "pages": ceil(total / per_page),
+    }
+
+
+def commit_session():
+    """Commit the database session, or only flush it inside an atomic batch."""
+    if g.get("defer_commit"):
+        db.session.flush()
+    else:
+        db.session.commit()
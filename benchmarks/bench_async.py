@@ -0,0 +1,145 @@
+"""Compare read throughput of the WSGI and ASGI entry points.
+
+Seeds a temporary SQLite database, starts the threaded Werkzeug server
+(WSGI) and uvicorn (ASGI) in turn, and drives the read-heavy routes with
+an increasing number of concurrent connections.
+
+Usage:
+    uv run python benchmarks/bench_async.py --requests 2000 --concurrency 1 10 50 100
+"""
+
+import argparse
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from common import ROOT, wait_until_ready
+
+SERVERS = {
+    "wsgi": [
+        sys.executable,
+        "-c",
+        "import logging, sys; from werkzeug.serving import run_simple; from app.main import app; "
+        "logging.getLogger('werkzeug').setLevel(logging.ERROR); "
+        "run_simple('127.0.0.1', int(sys.argv[1]), app, threaded=True)",
+    ],
+    "asgi": [
+        sys.executable,
+        "-m",
+        "uvicorn",
+        "app.asgi:app",
+        "--log-level",
+        "warning",
+        "--port",
+    ],
+}
+
+
+def seed(database_url, users, tasks_per_user):
+    """Create a database with sample users and tasks."""
+    os.environ["DATABASE_URL"] = database_url
+    sys.path.insert(0, str(ROOT))
+
+    from app.main import create_app
+    from app.models import db, User, Task
+
+    app = create_app("production")
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        for i in range(users):
+            db.session.add(User(username=f"user{i}", email=f"user{i}@example.com"))
+        db.session.commit()
+
+        statuses = ["pending", "in_progress", "completed"]
+        priorities = ["low", "medium", "high"]
+        for user_id in range(1, users + 1):
+            for i in range(tasks_per_user):
+                db.session.add(
+                    Task(
+                        title=f"Task {i}",
+                        status=random.choice(statuses),
+                        priority=random.choice(priorities),
+                        user_id=user_id,
+                    )
+                )
+        db.session.commit()
+        db.engine.dispose()
+
+
+def make_paths(users, tasks_per_user, count):
+    """Build a random mix of read requests."""
+    total_tasks = users * tasks_per_user
+    choices = [
+        lambda: f"/api/tasks?user_id={random.randint(1, users)}",
+        lambda: f"/api/tasks/{random.randint(1, total_tasks)}",
+        lambda: "/api/stats",
+        lambda: "/api/users",
+    ]
+    return [random.choice(choices)() for _ in range(count)]
+
+
+def fetch(url):
+    """Fetch one URL and return its latency in seconds."""
+    start = time.perf_counter()
+    with urllib.request.urlopen(url, timeout=30) as response:
+        response.read()
+    return time.perf_counter() - start
+
+
+def run_load(base_url, paths, concurrency):
+    """Send all requests with a fixed number of concurrent connections."""
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = list(executor.map(fetch, [base_url + path for path in paths]))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "throughput": len(paths) / elapsed,
+        "p50": statistics.median(latencies) * 1000,
+        "p99": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50, 100])
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--tasks-per-user", type=int, default=40)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        database_url = f"sqlite:///{Path(directory) / 'bench.db'}"
+        seed(database_url, args.users, args.tasks_per_user)
+        paths = make_paths(args.users, args.tasks_per_user, args.requests)
+
+        env = {**os.environ, "DATABASE_URL": database_url, "FLASK_ENV": "production"}
+        base_url = f"http://127.0.0.1:{args.port}"
+
+        print(f"{'server':<8}{'conns':>8}{'req/s':>12}{'p50 ms':>10}{'p99 ms':>10}")
+        for name, command in SERVERS.items():
+            server = subprocess.Popen(command + [str(args.port)], cwd=ROOT, env=env)
+            try:
+                wait_until_ready(base_url)
+                for concurrency in args.concurrency:
+                    result = run_load(base_url, paths, concurrency)
+                    print(
+                        f"{name:<8}{concurrency:>8}{result['throughput']:>12.1f}"
+                        f"{result['p50']:>10.1f}{result['p99']:>10.1f}"
+                    )
+            finally:
+                server.terminate()
+                server.wait()
+
+
+if __name__ == "__main__":
+    main()
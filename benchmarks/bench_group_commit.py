@@ -0,0 +1,56 @@
+"""Compare task write throughput and latency with and without group commit.
+
+Starts the production server over a fresh SQLite file, once with
+GROUP_COMMIT off and once with it on, and creates tasks from an increasing
+number of concurrent connections. Writes are only coalesced within a
+worker process, so the server runs threaded workers.
+
+Usage:
+    uv run python benchmarks/bench_group_commit.py --concurrency 1 8 32 64
+"""
+
+import argparse
+import os
+import tempfile
+from pathlib import Path
+from common import create_users, production_server, run_writes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--writes", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 64])
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--max-batch", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, default=2)
+    parser.add_argument("--port", type=int, default=8767)
+    args = parser.parse_args()
+
+    print(f"{'group':<8}{'conns':>8}{'writes/s':>12}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}")
+
+    for group_commit in ("false", "true"):
+        with tempfile.TemporaryDirectory() as directory:
+            env = {
+                **os.environ,
+                "DATABASE_URL": f"sqlite:///{Path(directory) / 'bench.db'}",
+                "GROUP_COMMIT": group_commit,
+                "GROUP_COMMIT_MAX_BATCH": str(args.max_batch),
+                "GROUP_COMMIT_MAX_WAIT_MS": str(args.max_wait_ms),
+            }
+            options = ("--workers", str(args.workers), "--threads", str(args.threads))
+            with production_server(args.port, env, *options) as base_url:
+                create_users(base_url, args.users)
+
+                name = "on" if group_commit == "true" else "off"
+                for concurrency in args.concurrency:
+                    result = run_writes(base_url, args.users, args.writes, concurrency)
+                    print(
+                        f"{name:<8}{concurrency:>8}{result['throughput']:>12.1f}"
+                        f"{result['p50']:>10.1f}{result['p99']:>10.1f}{result['errors']:>8}"
+                    )
+
+
+if __name__ == "__main__":
+    main()
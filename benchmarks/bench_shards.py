@@ -0,0 +1,48 @@
+"""Measure task write throughput as the number of shards grows.
+
+For each shard count, starts the production server (pre-forked gunicorn
+workers) over fresh SQLite files, creates users through the API and then
+creates tasks for them from many concurrent connections.
+
+Usage:
+    uv run python benchmarks/bench_shards.py --shards 1 2 4 8 --workers 4 --concurrency 32
+"""
+
+import argparse
+import os
+import tempfile
+from pathlib import Path
+from common import create_users, production_server, run_writes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--writes", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=64)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+
+    print(f"{'shards':<8}{'writes/s':>12}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}")
+
+    for shards in args.shards:
+        with tempfile.TemporaryDirectory() as directory:
+            env = {
+                **os.environ,
+                "DATABASE_URL": f"sqlite:///{Path(directory) / 'bench.db'}",
+                "TASK_SHARDS": str(shards),
+                "TASK_SHARD_URL": f"sqlite:///{Path(directory) / 'bench_shard{shard}.db'}",
+            }
+            with production_server(args.port, env, "--workers", str(args.workers)) as base_url:
+                create_users(base_url, args.users)
+                result = run_writes(base_url, args.users, args.writes, args.concurrency)
+                print(
+                    f"{shards:<8}{result['throughput']:>12.1f}"
+                    f"{result['p50']:>10.1f}{result['p99']:>10.1f}{result['errors']:>8}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Helpers shared by the benchmarks that drive a running server over HTTP."""
+
+import json
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+
+
+def wait_until_ready(base_url, timeout=15):
+    """Wait for a server to start answering requests."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(f"{base_url}/health", timeout=1).read()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Server at {base_url} did not start")
+
+
+@contextmanager
+def production_server(port, env, *options):
+    """Run app.serve on a local port until the block exits."""
+    command = [
+        sys.executable,
+        "-m",
+        "app.serve",
+        "--bind",
+        f"127.0.0.1:{port}",
+        "--max-requests",
+        "0",
+        *options,
+    ]
+    server = subprocess.Popen(
+        command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        base_url = f"http://127.0.0.1:{port}"
+        wait_until_ready(base_url)
+        yield base_url
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def post(url, body):
+    """POST a JSON body and return (latency in seconds, whether it succeeded)."""
+    request = urllib.request.Request(
+        url, data=json.dumps(body).encode(), headers={"Content-Type": "application/json"}
+    )
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            response.read()
+        ok = True
+    except urllib.error.HTTPError:
+        ok = False
+    return time.perf_counter() - start, ok
+
+
+def create_users(base_url, users):
+    """Create the users the tasks are written for."""
+    for i in range(users):
+        post(f"{base_url}/api/users", {"username": f"user{i}", "email": f"user{i}@example.com"})
+
+
+def run_writes(base_url, users, writes, concurrency):
+    """Create tasks for all users round-robin with a fixed number of connections."""
+    bodies = [{"title": f"Task {i}", "user_id": i % users + 1} for i in range(writes)]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(lambda body: post(f"{base_url}/api/tasks", body), bodies))
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for latency, _ in results)
+    return {
+        "throughput": writes / elapsed,
+        "p50": statistics.median(latencies) * 1000,
+        "p99": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        "errors": sum(1 for _, ok in results if not ok),
+    }
@@ -1,23 +1,148 @@
 """Database initialization and seeding utilities."""
 
 from app.main import app
-from app.models import db, User, Task, Category
+from app.models import db, User, Task, Category, TASK_PRIORITIES, TASK_STATUSES
+from app.archive import archive_completed_tasks, recount_archived_tasks
+from app.sharding import create_shard_tables, drop_shard_tables, reshard_tasks, use_user_shard
 from datetime import datetime, timedelta
+from sqlalchemy import text
+import time
 
 
 def init_db():
     """Initialize the database and create tables."""
     with app.app_context():
         db.create_all()
+
+        # create_all() skips tables that already exist, so add indexes
+        # introduced after the database was first created
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(bind=db.engine, checkfirst=True)
+
+        create_shard_tables()
+
         print("Database tables created successfully!")
 
 
+def normalized_choice(column):
+    """SQL expression spelling a legacy text value the way the API does."""
+    return f"lower(replace(replace(trim({column}), ' ', '_'), '-', '_'))"
+
+
+def choice_code(column, choices, default):
+    """SQL expression mapping a legacy text value to its integer code."""
+    whens = " ".join(f"WHEN '{choice}' THEN {code}" for code, choice in enumerate(choices))
+    return f"CASE {normalized_choice(column)} {whens} ELSE {choices.index(default)} END"
+
+
+def migrate_db():
+    """Upgrade an existing tasks table to the current schema.
+
+    Converts text status and priority columns to integer codes and, on
+    SQLite, switches task IDs to AUTOINCREMENT so the IDs of archived tasks
+    are never handed out again. Also rebuilds the archive counts.
+    """
+    with app.app_context():
+        inspector = db.inspect(db.engine)
+        columns = {column["name"]: column["type"] for column in inspector.get_columns("tasks")}
+        text_choices = isinstance(columns["status"], db.String)
+
+        reuses_ids = False
+        if db.engine.dialect.name == "sqlite":
+            with db.engine.connect() as connection:
+                table_sql = connection.execute(
+                    text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'tasks'")
+                ).scalar()
+            reuses_ids = "AUTOINCREMENT" not in table_sql.upper()
+
+        if text_choices or reuses_ids:
+            rebuild_tasks_table(inspector, text_choices)
+            print("Tasks table migrated to the current schema!")
+        else:
+            print("Tasks table is already up to date.")
+
+        # Add tables introduced since the database was created
+        db.create_all()
+        create_shard_tables()
+        recount_archived_tasks()
+
+
+def rebuild_tasks_table(inspector, text_choices):
+    """Recreate the tasks table from the model and copy the rows over."""
+    with db.engine.begin() as connection:
+        status = priority = None
+        if text_choices:
+            # Values that do not match a known spelling fall back to the default
+            for column, choices, default in (
+                ("status", TASK_STATUSES, "pending"),
+                ("priority", TASK_PRIORITIES, "medium"),
+            ):
+                allowed = ", ".join(f"'{choice}'" for choice in choices)
+                unknown = connection.execute(
+                    text(
+                        f"SELECT {column}, COUNT(*) FROM tasks "
+                        f"WHERE {column} IS NULL OR {normalized_choice(column)} NOT IN ({allowed}) "
+                        f"GROUP BY {column}"
+                    )
+                )
+                for value, count in unknown:
+                    print(f"{count} tasks with {column} {value!r} will be set to {default!r}")
+
+            status = choice_code("status", TASK_STATUSES, "pending")
+            priority = choice_code("priority", TASK_PRIORITIES, "medium")
+
+        for index in inspector.get_indexes("tasks"):
+            connection.execute(text(f"DROP INDEX {index['name']}"))
+        connection.execute(text("ALTER TABLE tasks RENAME TO tasks_legacy"))
+        Task.__table__.create(connection)
+
+        copied = "id, title, description, due_date, created_at, updated_at, user_id"
+        connection.execute(
+            text(
+                f"INSERT INTO tasks ({copied}, status, priority) "
+                f"SELECT {copied}, {status or 'status'}, {priority or 'priority'} "
+                f"FROM tasks_legacy"
+            )
+        )
+        connection.execute(text("DROP TABLE tasks_legacy"))
+
+
+def archive_db(older_than_days=None, every=None):
+    """Move old completed tasks to the archive, once or every N seconds."""
+    while True:
+        with app.app_context():
+            archived = archive_completed_tasks(older_than_days)
+        print(f"Archived {archived} completed tasks")
+
+        if not every:
+            break
+        time.sleep(every)
+
+
+def reshard_db():
+    """Move tasks from the RESHARD_FROM shard layout to the TASK_SHARDS one."""
+    with app.app_context():
+        previous_shards = app.config["RESHARD_FROM"]
+        if not previous_shards:
+            print("Set RESHARD_FROM to the shard count the tasks are spread over now")
+            return
+
+        moved = reshard_tasks(previous_shards)
+        print(
+            f"Moved the tasks of {moved} users from {previous_shards} "
+            f"to {app.config['TASK_SHARDS']} shards"
+        )
+
+
 def seed_db():
     """Seed the database with sample data."""
     with app.app_context():
         # Clear existing data
+        drop_shard_tables()
         db.drop_all()
         db.create_all()
+        create_shard_tables()
 
         # Create sample users
         users = [
@@ -100,9 +225,9 @@ def seed_db():
         ]
 
         for task in tasks:
-            db.session.add(task)
-
-        db.session.commit()
+            with use_user_shard(task.user_id):
+                db.session.add(task)
+                db.session.commit()
 
         print("Database seeded successfully!")
         print(f"Created {len(users)} users")
@@ -111,6 +236,7 @@ def seed_db():
 
 
 if __name__ == "__main__":
+    import argparse
     import sys
 
     if len(sys.argv) > 1:
@@ -118,9 +244,22 @@ if __name__ == "__main__":
             init_db()
         elif sys.argv[1] == "seed":
             seed_db()
+        elif sys.argv[1] == "migrate":
+            migrate_db()
+        elif sys.argv[1] == "archive":
+            parser = argparse.ArgumentParser(prog="python init_db.py archive")
+            parser.add_argument("--older-than-days", type=int)
+            parser.add_argument("--every", type=int, help="repeat every N seconds")
+            args = parser.parse_args(sys.argv[2:])
+            archive_db(args.older_than_days, args.every)
+        elif sys.argv[1] == "reshard":
+            reshard_db()
         else:
-            print("Usage: python init_db.py [init|seed]")
+            print("Usage: python init_db.py [init|seed|migrate|archive|reshard]")
     else:
-        print("Usage: python init_db.py [init|seed]")
-        print("  init - Create database tables")
-        print("  seed - Seed database with sample data")
+        print("Usage: python init_db.py [init|seed|migrate|archive|reshard]")
+        print("  init    - Create database tables")
+        print("  seed    - Seed database with sample data")
+        print("  migrate - Upgrade an existing database to the current schema")
+        print("  archive - Move old completed tasks to the archive table")
+        print("  reshard - Move tasks to their shard after TASK_SHARDS changed")
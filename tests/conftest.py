@@ -1,6 +1,7 @@
 """Test configuration and fixtures."""
 
 import pytest
+from app.config import TestingConfig
 from app.main import create_app
 from app.models import db as _db
 
@@ -26,3 +27,33 @@ def db(app):
 def client(app, db):
     """Create test client."""
     return app.test_client()
+
+
+@pytest.fixture(scope="function")
+def file_app(tmp_path, monkeypatch):
+    """Create applications over a database file in tmp_path.
+
+    Returns a factory taking config settings to override. Engines of the
+    applications created are disposed after the test.
+    """
+    apps = []
+
+    def create(**settings):
+        monkeypatch.setattr(
+            TestingConfig, "SQLALCHEMY_DATABASE_URI", f"sqlite:///{tmp_path / 'tasks.db'}"
+        )
+        for name, value in settings.items():
+            monkeypatch.setattr(TestingConfig, name, value)
+        # The extension keeps a metadata per bind, don't leak the shards' to other tests
+        monkeypatch.setattr(_db, "metadatas", dict(_db.metadatas))
+
+        app = create_app("testing")
+        apps.append(app)
+        return app
+
+    yield create
+
+    for app in apps:
+        with app.app_context():
+            for engine in _db.engines.values():
+                engine.dispose()
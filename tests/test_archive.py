@@ -0,0 +1,160 @@
+"""Tests for archiving completed tasks."""
+
+import json
+from app.archive import archive_completed_tasks, archived_counts, recount_archived_tasks
+from app.models import db, TaskArchiveCount
+
+
+def create_tasks(client):
+    """Create a user with one completed and one pending task."""
+    user_response = client.post(
+        "/api/users",
+        data=json.dumps({"username": "testuser", "email": "test@example.com"}),
+        content_type="application/json",
+    )
+    user_id = json.loads(user_response.data)["id"]
+
+    task_ids = []
+    for title, status in (("Done", "completed"), ("Open", "pending")):
+        response = client.post(
+            "/api/tasks",
+            data=json.dumps({"title": title, "status": status, "user_id": user_id}),
+            content_type="application/json",
+        )
+        task_ids.append(json.loads(response.data)["id"])
+
+    return user_id, task_ids
+
+
+def test_archive_completed_tasks(client):
+    """Test that old completed tasks move to the archive and stay readable."""
+    user_id, (done_id, open_id) = create_tasks(client)
+
+    assert archive_completed_tasks(older_than_days=1) == 0
+    assert archive_completed_tasks(older_than_days=0, chunk_size=1) == 1
+
+    data = json.loads(client.get("/api/tasks").data)
+    assert [task["id"] for task in data] == [open_id]
+
+    data = json.loads(client.get("/api/tasks?include_archived=true&status=completed").data)
+    assert [task["id"] for task in data] == [done_id]
+    assert data[0]["archived"] is True
+
+    response = client.get(f"/api/tasks/{done_id}")
+    assert response.status_code == 200
+    assert json.loads(response.data)["title"] == "Done"
+
+    data = json.loads(client.get("/api/stats").data)
+    assert data["total_tasks"] == 2
+    assert data["tasks_by_status"]["completed"] == 1
+
+    # New tasks never reuse the ID of an archived one
+    response = client.post(
+        "/api/tasks",
+        data=json.dumps({"title": "New", "user_id": user_id}),
+        content_type="application/json",
+    )
+    assert json.loads(response.data)["id"] > open_id
+
+
+def test_archived_tasks_in_task_count(client):
+    """Test that archiving tasks does not change a user's task count."""
+    user_id, _ = create_tasks(client)
+    assert archive_completed_tasks(older_than_days=0) == 1
+
+    data = json.loads(client.get(f"/api/users/{user_id}").data)
+    assert data["task_count"] == 2
+
+    data = json.loads(client.get("/api/users").data)
+    assert [user["task_count"] for user in data] == [2]
+
+
+def test_update_archived_task(client):
+    """Test that updating an archived task moves it back to the live table."""
+    _, (done_id, _) = create_tasks(client)
+    archive_completed_tasks(older_than_days=0)
+
+    response = client.put(
+        f"/api/tasks/{done_id}",
+        data=json.dumps({"status": "in_progress"}),
+        content_type="application/json",
+    )
+    assert response.status_code == 200
+    assert json.loads(response.data)["status"] == "in_progress"
+
+    data = json.loads(client.get("/api/tasks?status=in_progress").data)
+    assert [task["id"] for task in data] == [done_id]
+    assert "archived" not in data[0]
+
+
+def test_delete_archived_tasks(client):
+    """Test deleting archived tasks directly and with their owner."""
+    user_id, (done_id, _) = create_tasks(client)
+    archive_completed_tasks(older_than_days=0)
+
+    response = client.delete(f"/api/tasks/{done_id}")
+    assert response.status_code == 200
+    assert client.get(f"/api/tasks/{done_id}").status_code == 404
+
+    response = client.post(
+        "/api/tasks",
+        data=json.dumps({"title": "Done again", "status": "completed", "user_id": user_id}),
+        content_type="application/json",
+    )
+    done_again_id = json.loads(response.data)["id"]
+    archive_completed_tasks(older_than_days=0)
+
+    client.delete(f"/api/users/{user_id}")
+    assert client.get(f"/api/tasks/{done_again_id}").status_code == 404
+
+    data = json.loads(client.get("/api/tasks/changes").data)
+    assert data["tasks"] == []
+
+
+def test_archive_counts(client):
+    """Test that stats come from archive counts kept up to date by every change."""
+    user_id, (done_id, _) = create_tasks(client)
+    response = client.post(
+        "/api/tasks",
+        data=json.dumps(
+            {"title": "Urgent", "status": "completed", "priority": "high", "user_id": user_id}
+        ),
+        content_type="application/json",
+    )
+    urgent_id = json.loads(response.data)["id"]
+
+    assert archive_completed_tasks(older_than_days=0) == 2
+    assert archived_counts() == {("completed", "medium"): 1, ("completed", "high"): 1}
+
+    statements = []
+
+    def record(connection, cursor, statement, *args):
+        statements.append(statement)
+
+    db.event.listen(db.engine, "before_cursor_execute", record)
+    try:
+        data = json.loads(client.get("/api/stats").data)
+    finally:
+        db.event.remove(db.engine, "before_cursor_execute", record)
+    assert not any("tasks_archive" in statement for statement in statements)
+    assert data["total_tasks"] == 3
+    assert data["tasks_by_status"] == {"pending": 1, "in_progress": 0, "completed": 2}
+    assert data["tasks_by_priority"] == {"low": 0, "medium": 2, "high": 1}
+
+    # Counts that drifted are rebuilt from the archive, as init_db.py migrate does
+    TaskArchiveCount.adjust({("completed", "low"): 5})
+    db.session.commit()
+    recount_archived_tasks()
+    assert archived_counts() == {("completed", "medium"): 1, ("completed", "high"): 1}
+
+    client.put(
+        f"/api/tasks/{done_id}",
+        data=json.dumps({"status": "in_progress"}),
+        content_type="application/json",
+    )
+    client.delete(f"/api/tasks/{urgent_id}")
+    assert archived_counts() == {("completed", "medium"): 0, ("completed", "high"): 0}
+
+    data = json.loads(client.get("/api/stats").data)
+    assert data["total_tasks"] == 2
+    assert data["tasks_by_status"] == {"pending": 1, "in_progress": 1, "completed": 0}
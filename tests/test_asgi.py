@@ -0,0 +1,187 @@
+"""Tests for the ASGI entry point."""
+
+import asyncio
+import json
+import pytest
+
+pytest.importorskip("aiosqlite")
+pytest.importorskip("asgiref")
+
+from app.archive import archive_completed_tasks  # noqa: E402
+from app.asgi import create_asgi_app  # noqa: E402
+
+
+@pytest.fixture
+def asgi_app(file_app):
+    """Create an ASGI app over a file database shared with the sync engine."""
+    asgi_app = create_asgi_app(file_app())
+    yield asgi_app
+
+    asyncio.run(asgi_app.engine.dispose())
+
+
+def make_scope(method, path, query_string="", content=b""):
+    """Build the HTTP scope of a request."""
+    return {
+        "type": "http",
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": query_string.encode(),
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(content)).encode()),
+        ],
+        "client": ("127.0.0.1", 12345),
+        "server": ("testserver", 80),
+    }
+
+
+async def asgi_call(asgi_app, method, path, query_string="", body=None):
+    """Send one request to an ASGI app from a running loop, return (status, JSON body)."""
+    content = json.dumps(body).encode() if body is not None else b""
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": content, "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    await asgi_app(make_scope(method, path, query_string, content), receive, send)
+
+    status = messages[0]["status"]
+    data = b"".join(message.get("body", b"") for message in messages[1:])
+    return status, json.loads(data)
+
+
+def asgi_request(asgi_app, method, path, query_string="", body=None):
+    """Send one request to an ASGI app and return (status, JSON body)."""
+    return asyncio.run(asgi_call(asgi_app, method, path, query_string, body))
+
+
+def test_async_routes(asgi_app):
+    """Test the async read routes against data written through Flask."""
+    status, user = asgi_request(
+        asgi_app, "POST", "/api/users", body={"username": "testuser", "email": "test@example.com"}
+    )
+    assert status == 201
+
+    status, task = asgi_request(
+        asgi_app, "POST", "/api/tasks", body={"title": "Task 1", "user_id": user["id"]}
+    )
+    assert status == 201
+
+    status, data = asgi_request(asgi_app, "GET", "/api/tasks", f"user_id={user['id']}")
+    assert status == 200
+    assert [item["id"] for item in data] == [task["id"]]
+
+    status, data = asgi_request(asgi_app, "GET", "/api/tasks", "status=completed")
+    assert data == []
+
+    status, data = asgi_request(asgi_app, "GET", "/api/tasks", "page=1&per_page=10")
+    assert [item["id"] for item in data["items"]] == [task["id"]]
+    assert (data["total"], data["pages"]) == (1, 1)
+
+    # per_page is clamped the same way the Flask route clamps it
+    status, data = asgi_request(asgi_app, "GET", "/api/tasks", "page=1&per_page=0")
+    assert (data["per_page"], data["pages"]) == (1, 1)
+
+    status, data = asgi_request(asgi_app, "GET", f"/api/tasks/{task['id']}")
+    assert data["title"] == "Task 1"
+
+    status, data = asgi_request(asgi_app, "GET", "/api/tasks/999")
+    assert status == 404
+
+    status, data = asgi_request(asgi_app, "GET", "/api/users")
+    assert data[0]["task_count"] == 1
+
+    status, data = asgi_request(asgi_app, "GET", "/api/stats")
+    assert data["total_tasks"] == 1
+    assert data["tasks_by_status"] == {"pending": 1, "in_progress": 0, "completed": 0}
+
+
+def test_async_routes_read_archive(asgi_app):
+    """Test that the async routes read through to archived tasks."""
+    status, user = asgi_request(
+        asgi_app, "POST", "/api/users", body={"username": "testuser", "email": "test@example.com"}
+    )
+    status, task = asgi_request(
+        asgi_app,
+        "POST",
+        "/api/tasks",
+        body={"title": "Task 1", "status": "completed", "user_id": user["id"]},
+    )
+    with asgi_app.flask_app.app_context():
+        assert archive_completed_tasks(older_than_days=0) == 1
+
+    status, data = asgi_request(asgi_app, "GET", "/api/tasks")
+    assert data == []
+
+    status, data = asgi_request(asgi_app, "GET", "/api/tasks", "include_archived=true")
+    assert [item["id"] for item in data] == [task["id"]]
+
+    status, data = asgi_request(asgi_app, "GET", f"/api/tasks/{task['id']}")
+    assert data["archived"] is True
+
+    status, data = asgi_request(asgi_app, "GET", "/api/stats")
+    assert data["total_tasks"] == 1
+    assert data["tasks_by_status"]["completed"] == 1
+
+    status, data = asgi_request(asgi_app, "GET", "/api/users")
+    assert data[0]["task_count"] == 1
+
+
+def test_stream_does_not_block_writes(asgi_app):
+    """Test that a write completes and is streamed while a stream is open."""
+    status, user = asgi_request(
+        asgi_app, "POST", "/api/users", body={"username": "testuser", "email": "test@example.com"}
+    )
+
+    async def scenario():
+        messages = asyncio.Queue()
+        requested = False
+        disconnected = asyncio.Event()
+
+        async def receive():
+            nonlocal requested
+            if not requested:
+                requested = True
+                return {"type": "http.request", "body": b"", "more_body": False}
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+
+        async def next_body():
+            message = await asyncio.wait_for(messages.get(), timeout=5)
+            return message["body"].decode()
+
+        stream = asyncio.ensure_future(
+            asgi_app(make_scope("GET", "/api/tasks/stream"), receive, messages.put)
+        )
+        start = await asyncio.wait_for(messages.get(), timeout=5)
+        assert start["status"] == 200
+        assert await next_body() == ": connected\n\n"
+
+        # The write runs through the Flask fallback while the stream waits
+        status, task = await asyncio.wait_for(
+            asgi_call(
+                asgi_app, "POST", "/api/tasks", body={"title": "Task 1", "user_id": user["id"]}
+            ),
+            timeout=5,
+        )
+        assert status == 201
+        assert "event: task.created" in await next_body()
+
+        status, health = await asyncio.wait_for(asgi_call(asgi_app, "GET", "/health"), timeout=5)
+        assert status == 200
+
+        disconnected.set()
+        await asyncio.wait_for(stream, timeout=5)
+        return task
+
+    task = asyncio.run(scenario())
+    assert task["title"] == "Task 1"
+    assert not asgi_app.flask_app.extensions["event_broker"]._subscriptions
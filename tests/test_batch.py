@@ -0,0 +1,147 @@
+"""Tests for the batch endpoint."""
+
+import json
+from flask import jsonify
+from app import batch
+from app.models import db, Category
+
+
+def post_batch(client, sub_requests, **options):
+    """Send a batch request and return the response."""
+    return client.post(
+        "/api/batch",
+        data=json.dumps({"requests": sub_requests, **options}),
+        content_type="application/json",
+    )
+
+
+def test_batch(client):
+    """Test running several requests in one batch."""
+    response = post_batch(
+        client,
+        [
+            {
+                "method": "POST",
+                "path": "/api/users",
+                "body": {"username": "testuser", "email": "test@example.com"},
+            },
+            {"method": "GET", "path": "/api/users/1"},
+            {"method": "GET", "path": "/api/tasks?user_id=1"},
+            {"method": "GET", "path": "/api/tasks/1"},
+        ],
+    )
+
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    statuses = [item["status"] for item in data["responses"]]
+    assert statuses == [201, 200, 200, 404]
+    assert data["responses"][1]["body"]["username"] == "testuser"
+    assert data["responses"][2]["body"] == []
+    assert "committed" not in data
+
+
+def test_batch_atomic_rollback(client):
+    """Test that a failing request rolls back an atomic batch."""
+    response = post_batch(
+        client,
+        [
+            {
+                "method": "POST",
+                "path": "/api/users",
+                "body": {"username": "testuser", "email": "test@example.com"},
+            },
+            {"method": "POST", "path": "/api/tasks", "body": {"title": "No owner"}},
+            {"method": "GET", "path": "/api/users"},
+        ],
+        atomic=True,
+    )
+
+    data = json.loads(response.data)
+    statuses = [item["status"] for item in data["responses"]]
+    assert statuses == [201, 400, 424]
+    assert data["committed"] is False
+
+    users = json.loads(client.get("/api/users").data)
+    assert users == []
+
+
+def test_batch_failed_request_changes_dropped(app, client, monkeypatch):
+    """Test that a failed request's changes are not committed by a later one."""
+
+    def half_create_category():
+        db.session.add(Category(name="Half done"))
+        return jsonify({"error": "Failed after adding"}), 400
+
+    monkeypatch.setitem(app.view_functions, "create_category", half_create_category)
+    response = post_batch(
+        client,
+        [
+            {"method": "POST", "path": "/api/categories", "body": {"name": "Half done"}},
+            {
+                "method": "POST",
+                "path": "/api/users",
+                "body": {"username": "testuser", "email": "test@example.com"},
+            },
+        ],
+    )
+
+    statuses = [item["status"] for item in json.loads(response.data)["responses"]]
+    assert statuses == [400, 201]
+    assert Category.query.count() == 0
+
+
+def test_batch_dedupes_gets(client, monkeypatch):
+    """Test that identical GETs between writes are dispatched once."""
+    calls = []
+    dispatch = batch.dispatch_sub_request
+
+    def counting_dispatch(app, method, path, body):
+        calls.append((method, path))
+        return dispatch(app, method, path, body)
+
+    monkeypatch.setattr(batch, "dispatch_sub_request", counting_dispatch)
+
+    response = post_batch(
+        client,
+        [
+            {"path": "/api/stats"},
+            {"path": "/api/stats"},
+            {
+                "method": "POST",
+                "path": "/api/categories",
+                "body": {"name": "Work"},
+            },
+            {"path": "/api/stats"},
+        ],
+    )
+
+    data = json.loads(response.data)
+    assert data["responses"][0] == data["responses"][1]
+    assert data["responses"][3]["body"]["total_categories"] == 1
+    assert calls.count(("GET", "/api/stats")) == 2
+
+
+def test_batch_invalid(client, app, monkeypatch):
+    """Test rejecting invalid batches and sub-requests."""
+    response = post_batch(client, [])
+    assert response.status_code == 400
+
+    response = post_batch(
+        client,
+        [
+            {"path": "/api/batch", "method": "POST"},
+            {"path": "/api/tasks/stream"},
+            {"path": "/health", "method": "PATCH"},
+        ],
+    )
+    data = json.loads(response.data)
+    assert [item["status"] for item in data["responses"]] == [400, 400, 400]
+
+    monkeypatch.setitem(app.config, "BATCH_MAX_REQUESTS", 2)
+    response = post_batch(client, [{"path": "/health"}] * 3)
+    assert response.status_code == 400
+
+    # Only a JSON boolean picks the mode; "false" must not run atomically
+    for atomic in ("false", 1, None):
+        response = post_batch(client, [{"path": "/health"}], atomic=atomic)
+        assert response.status_code == 400
@@ -0,0 +1,71 @@
+"""Tests for task change events and the event stream."""
+
+import json
+from app.events import InProcessBroker
+
+
+def make_event(user_id=1, status="pending", event_type="task.created"):
+    """Build a minimal task event."""
+    task = {"id": 1, "user_id": user_id, "status": status}
+    return {"type": event_type, "task": task, "cursor": "2024-01-01T00:00:00"}
+
+
+def test_broker_filters_events():
+    """Test that subscribers only receive events matching their filters."""
+    broker = InProcessBroker(queue_size=10)
+    everything = broker.subscribe()
+    user_two = broker.subscribe(user_id=2)
+    completed = broker.subscribe(status="completed")
+
+    broker.publish(make_event(user_id=1, status="pending"))
+    broker.publish(make_event(user_id=2, status="completed"))
+
+    assert everything.get(timeout=0)["task"]["user_id"] == 1
+    assert everything.get(timeout=0)["task"]["user_id"] == 2
+    assert user_two.get(timeout=0)["task"]["user_id"] == 2
+    assert completed.get(timeout=0)["task"]["status"] == "completed"
+    assert user_two._queue.empty()
+    assert completed._queue.empty()
+
+
+def test_broker_drops_slow_subscriber():
+    """Test that a full subscriber queue closes the subscription."""
+    broker = InProcessBroker(queue_size=2)
+    subscription = broker.subscribe()
+
+    for _ in range(3):
+        broker.publish(make_event())
+
+    assert subscription.overflowed
+    assert subscription.get(timeout=0) is None
+    assert subscription not in broker._subscriptions
+
+
+def test_stream_tasks(app, client):
+    """Test streaming task changes as Server-Sent Events."""
+    user_response = client.post(
+        "/api/users",
+        data=json.dumps({"username": "testuser", "email": "test@example.com"}),
+        content_type="application/json",
+    )
+    user_id = json.loads(user_response.data)["id"]
+
+    response = client.get(f"/api/tasks/stream?user_id={user_id}", buffered=False)
+    assert response.status_code == 200
+    assert response.mimetype == "text/event-stream"
+
+    client.post(
+        "/api/tasks",
+        data=json.dumps({"title": "Task 1", "user_id": user_id}),
+        content_type="application/json",
+    )
+
+    chunks = iter(response.response)
+    assert next(chunks) == b": connected\n\n"
+    chunk = next(chunks).decode()
+    assert "event: task.created" in chunk
+    event = json.loads(chunk.split("data: ", 1)[1])
+    assert event["task"]["title"] == "Task 1"
+
+    response.close()
+    assert not app.extensions["event_broker"]._subscriptions
@@ -0,0 +1,147 @@
+"""Tests for group-commit write coalescing."""
+
+import json
+import threading
+from concurrent import futures
+import pytest
+from app.models import db, Category
+
+
+@pytest.fixture
+def group_app(file_app):
+    """Create an app with group commit over a file database."""
+    return file_app(GROUP_COMMIT=True, GROUP_COMMIT_MAX_BATCH=10, GROUP_COMMIT_MAX_WAIT_MS=200)
+
+
+def run_concurrently(count, target):
+    """Call target(i) from count threads at once and collect the results."""
+    results = [None] * count
+    barrier = threading.Barrier(count)
+
+    def run(i):
+        barrier.wait()
+        results[i] = target(i)
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_concurrent_writes_share_commits(group_app):
+    """Test that concurrent task writes are committed in batches."""
+    client = group_app.test_client()
+    response = client.post(
+        "/api/users",
+        data=json.dumps({"username": "testuser", "email": "test@example.com"}),
+        content_type="application/json",
+    )
+    user_id = json.loads(response.data)["id"]
+
+    commits = []
+    with group_app.app_context():
+        db.event.listen(db.engine, "commit", commits.append)
+
+    def create_task(i):
+        return group_app.test_client().post(
+            "/api/tasks",
+            data=json.dumps({"title": f"Task {i}", "user_id": user_id}),
+            content_type="application/json",
+        )
+
+    responses = run_concurrently(20, create_task)
+    assert [response.status_code for response in responses] == [201] * 20
+    tasks = [json.loads(response.data) for response in responses]
+    assert len({task["id"] for task in tasks}) == 20
+    assert sorted(task["title"] for task in tasks) == sorted(f"Task {i}" for i in range(20))
+    assert 2 <= len(commits) < 20
+
+    response = client.put(
+        f"/api/tasks/{tasks[0]['id']}",
+        data=json.dumps({"status": "completed"}),
+        content_type="application/json",
+    )
+    assert json.loads(response.data)["status"] == "completed"
+
+    response = client.put(
+        "/api/tasks/999", data=json.dumps({"title": "Nope"}), content_type="application/json"
+    )
+    assert response.status_code == 404
+
+    data = json.loads(client.get("/api/stats").data)
+    assert data["total_tasks"] == 20
+    assert data["tasks_by_status"]["completed"] == 1
+
+
+def test_failed_write_only_fails_its_request(group_app):
+    """Test that a failing write does not take the rest of its batch down."""
+    committer = group_app.extensions["group_commit"]
+
+    def submit(i):
+        def add_category():
+            if i == 3:
+                raise ValueError("broken write")
+            category = Category(name=f"Category {i}")
+            db.session.add(category)
+            db.session.flush()
+            return category.to_dict()
+
+        try:
+            return committer.submit(add_category)
+        except ValueError as error:
+            return error
+
+    results = run_concurrently(6, submit)
+    assert isinstance(results[3], ValueError)
+    assert [result["name"] for i, result in enumerate(results) if i != 3] == [
+        f"Category {i}" for i in range(6) if i != 3
+    ]
+
+    data = json.loads(group_app.test_client().get("/api/categories").data)
+    assert sorted(category["name"] for category in data) == sorted(
+        f"Category {i}" for i in range(6) if i != 3
+    )
+
+
+def test_writer_survives_failed_batch(group_app, monkeypatch):
+    """Test that a batch failing outside its writes fails its requests, not the writer."""
+    committer = group_app.extensions["group_commit"]
+
+    def lose_connection(batch):
+        raise RuntimeError("connection lost")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(committer, "commit_batch", lose_connection)
+        with pytest.raises(RuntimeError, match="connection lost"):
+            committer.submit(lambda: "lost")
+
+    assert committer.submit(lambda: "next") == "next"
+
+
+def test_timed_out_write_is_dropped(group_app, monkeypatch):
+    """Test that a request stops waiting for a stuck writer and its write never runs."""
+    committer = group_app.extensions["group_commit"]
+    started = threading.Event()
+    release = threading.Event()
+    ran = []
+
+    def slow_write():
+        started.set()
+        release.wait(timeout=5)
+        ran.append("slow")
+
+    slow = threading.Thread(target=committer.submit, args=(slow_write,))
+    slow.start()
+    assert started.wait(timeout=5)
+
+    monkeypatch.setattr(committer, "timeout", 0.1)
+    with pytest.raises(futures.TimeoutError):
+        committer.submit(lambda: ran.append("dropped"))
+
+    release.set()
+    slow.join()
+    monkeypatch.setattr(committer, "timeout", 5)
+    assert committer.submit(lambda: "next") == "next"
+    assert ran == ["slow"]
@@ -0,0 +1,92 @@
+"""Tests for the database management commands."""
+
+import sqlite3
+import pytest
+import init_db
+from sqlalchemy import text
+from app.models import db, Task
+
+# The tasks table as created before status and priority became integer codes
+LEGACY_TASKS = """
+CREATE TABLE tasks (
+    id INTEGER NOT NULL,
+    title VARCHAR(200) NOT NULL,
+    description TEXT,
+    status VARCHAR(20),
+    priority VARCHAR(20),
+    due_date DATETIME,
+    created_at DATETIME,
+    updated_at DATETIME,
+    user_id INTEGER NOT NULL,
+    PRIMARY KEY (id),
+    FOREIGN KEY(user_id) REFERENCES users (id)
+)
+"""
+
+LEGACY_ROWS = [
+    (1, "Done", "Completed", "High"),
+    (2, "Doing", "In Progress", "low"),
+    (3, "Blocked", "blocked", None),
+    (5, "Dashed", "in-progress", "MEDIUM"),
+]
+
+
+@pytest.fixture
+def legacy_app(file_app, tmp_path, monkeypatch):
+    """Create an app over a database whose tasks table has the legacy schema."""
+    path = tmp_path / "tasks.db"
+    with sqlite3.connect(path) as connection:
+        connection.execute(LEGACY_TASKS)
+        connection.execute("CREATE INDEX ix_tasks_updated_at ON tasks (updated_at)")
+        connection.executemany(
+            "INSERT INTO tasks (id, title, status, priority, created_at, updated_at, user_id) "
+            "VALUES (?, ?, ?, ?, '2024-01-01 00:00:00', '2024-01-01 00:00:00', 1)",
+            LEGACY_ROWS,
+        )
+
+    app = file_app()
+    monkeypatch.setattr(init_db, "app", app)
+    return app
+
+
+def stored_choices(app):
+    """The raw status and priority codes of every task, by ID."""
+    with app.app_context():
+        rows = db.session.execute(text("SELECT id, status, priority FROM tasks ORDER BY id"))
+        return {task_id: (status, priority) for task_id, status, priority in rows}
+
+
+def test_migrate_legacy_tasks(legacy_app, capsys):
+    """Test converting text choices to codes and switching to AUTOINCREMENT."""
+    init_db.migrate_db()
+
+    output = capsys.readouterr().out
+    assert "1 tasks with status 'blocked' will be set to 'pending'" in output
+    assert "1 tasks with priority None will be set to 'medium'" in output
+    assert "Tasks table migrated to the current schema!" in output
+
+    # pending, in_progress, completed and low, medium, high
+    migrated = stored_choices(legacy_app)
+    assert migrated == {1: (2, 2), 2: (1, 0), 3: (0, 1), 5: (1, 1)}
+
+    with legacy_app.app_context():
+        table_sql = db.session.execute(
+            text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'tasks'")
+        ).scalar()
+        assert "AUTOINCREMENT" in table_sql.upper()
+        assert db.session.get(Task, 2).status == "in_progress"
+
+        # The ID of the newest task is not handed out again once it is gone
+        db.session.delete(db.session.get(Task, 5))
+        db.session.commit()
+        task = Task(title="New", user_id=1)
+        db.session.add(task)
+        db.session.commit()
+        assert task.id == 6
+
+    # Running it again finds nothing left to do and changes nothing
+    init_db.migrate_db()
+    output = capsys.readouterr().out
+    assert output.strip() == "Tasks table is already up to date."
+    migrated.pop(5)
+    assert stored_choices(legacy_app) == {**migrated, 6: (0, 1)}
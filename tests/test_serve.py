@@ -0,0 +1,64 @@
+"""Tests for the production server command."""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+import pytest
+
+pytest.importorskip("gunicorn")
+
+from app.models import db as _db  # noqa: E402
+from app.serve import build_options, event_broker_warning, parse_args, post_fork  # noqa: E402
+
+
+def test_serve_defaults():
+    """Test that the server preloads the app and uses every core."""
+    options = build_options(parse_args([]))
+    assert options["workers"] == (os.cpu_count() or 1)
+    assert options["preload_app"] is True
+    # Event streams outlive the worker timeout, which only sync workers enforce
+    assert options["worker_class"] == "gthread"
+    # An open stream holds a thread, so one must not take a whole worker
+    assert options["threads"] > 1
+    assert options["max_requests"] > 0
+    assert options["post_fork"] is post_fork
+
+
+def test_post_fork_disposes_engines(app, db):
+    """Test that a forked worker stops using the master's connections."""
+
+    class FakeLoader:
+        def wsgi(self):
+            return app
+
+    class FakeServer:
+        app = FakeLoader()
+
+    pool = _db.engine.pool
+    post_fork(FakeServer(), worker=None)
+    assert _db.engine.pool is not pool
+
+
+def test_event_broker_warning(app):
+    """Test warning that the in-process broker does not span workers."""
+    assert event_broker_warning(app, workers=1) is None
+    assert "EVENT_BROKER" in event_broker_warning(app, workers=4)
+
+
+def test_load_does_not_create_default_app():
+    """Test that loading the server's app builds only the configured one."""
+    code = (
+        "import app.main, app.serve; "
+        "server = app.serve.TaskManagerServer({'workers': 1}, config_name='testing'); "
+        "loaded = server.load(); "
+        "print(loaded.config['TESTING'], 'app' in vars(app.main))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=Path(__file__).parent.parent,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout.split() == ["True", "False"]
@@ -0,0 +1,222 @@
+"""Tests for sharding tasks across databases by user."""
+
+import json
+import pytest
+from app.config import task_shard_binds
+from app.archive import archive_completed_tasks, archived_counts
+from app.models import db, Task
+from app.sharding import (
+    SHARD_ID_BITS,
+    jump_hash,
+    move_user_tasks,
+    reshard_tasks,
+    shard_for_user,
+    use_shard,
+)
+
+
+def make_app(file_app, tmp_path, shards, reshard_from=0):
+    """Create an app whose tasks are spread over file databases in tmp_path."""
+    shard_url = f"sqlite:///{tmp_path}/tasks_shard{{shard}}.db"
+    return file_app(
+        TASK_SHARDS=shards,
+        RESHARD_FROM=reshard_from,
+        SQLALCHEMY_BINDS=task_shard_binds(shard_url, max(shards, reshard_from)),
+    )
+
+
+@pytest.fixture
+def sharded_app(file_app, tmp_path):
+    """Create an app with tasks spread over three shards."""
+    return make_app(file_app, tmp_path, 3)
+
+
+def create_users_and_tasks(client, users):
+    """Create users with one task each, returning the created tasks."""
+    tasks = []
+    for number in range(users):
+        response = client.post(
+            "/api/users",
+            data=json.dumps({"username": f"user{number}", "email": f"user{number}@example.com"}),
+            content_type="application/json",
+        )
+        user_id = json.loads(response.data)["id"]
+        response = client.post(
+            "/api/tasks",
+            data=json.dumps({"title": f"Task {number}", "user_id": user_id}),
+            content_type="application/json",
+        )
+        assert response.status_code == 201
+        tasks.append(json.loads(response.data))
+    return tasks
+
+
+def shard_task_ids(app, shard):
+    """IDs of the live tasks stored on one shard."""
+    with app.app_context(), use_shard(shard):
+        return set(db.session.scalars(db.select(Task.id)))
+
+
+def test_shard_map_is_stable():
+    """Test that adding a shard only moves users onto the new shard."""
+    assert [jump_hash(user_id, 3) for user_id in range(100)] == [
+        jump_hash(user_id, 3) for user_id in range(100)
+    ]
+    assert {jump_hash(user_id, 3) for user_id in range(100)} == {0, 1, 2}
+
+    for user_id in range(1000):
+        before, after = jump_hash(user_id, 3), jump_hash(user_id, 4)
+        assert after in (before, 3)
+
+
+def test_tasks_stored_on_users_shard(sharded_app):
+    """Test that each task lands on its owner's shard and is found there."""
+    client = sharded_app.test_client()
+    tasks = create_users_and_tasks(client, 8)
+
+    with sharded_app.app_context():
+        shards = {task["id"]: shard_for_user(task["user_id"]) for task in tasks}
+    assert set(shards.values()) == {0, 1, 2}
+
+    for task in tasks:
+        shard = shards[task["id"]]
+        assert task["id"] in shard_task_ids(sharded_app, shard)
+        # IDs come from the shard's own range, so they never collide
+        assert task["id"] >> SHARD_ID_BITS == shard
+
+    task = next(task for task in tasks if shards[task["id"]] == 2)
+    response = client.get(f"/api/tasks/{task['id']}")
+    assert json.loads(response.data)["title"] == task["title"]
+
+    response = client.put(
+        f"/api/tasks/{task['id']}",
+        data=json.dumps({"status": "completed"}),
+        content_type="application/json",
+    )
+    assert json.loads(response.data)["status"] == "completed"
+
+    response = client.get(f"/api/tasks?user_id={task['user_id']}")
+    assert [item["status"] for item in json.loads(response.data)] == ["completed"]
+
+    response = client.get(f"/api/users/{task['user_id']}")
+    assert json.loads(response.data)["task_count"] == 1
+
+    response = client.delete(f"/api/tasks/{task['id']}")
+    assert response.status_code == 200
+    assert client.get(f"/api/tasks/{task['id']}").status_code == 404
+    assert task["id"] not in shard_task_ids(sharded_app, 2)
+
+
+def test_scatter_gather(sharded_app):
+    """Test that cross-user routes merge the results of every shard."""
+    client = sharded_app.test_client()
+    tasks = create_users_and_tasks(client, 8)
+    ids = [task["id"] for task in tasks]
+
+    data = json.loads(client.get("/api/tasks").data)
+    assert [task["id"] for task in data] == ids
+
+    data = json.loads(client.get("/api/tasks?page=2&per_page=3").data)
+    assert [task["id"] for task in data["items"]] == ids[3:6]
+    assert (data["total"], data["pages"]) == (8, 3)
+
+    data = json.loads(client.get("/api/tasks?page=3&per_page=3").data)
+    assert [task["id"] for task in data["items"]] == ids[6:]
+
+    data = json.loads(client.get("/api/stats").data)
+    assert data["total_tasks"] == 8
+    assert data["tasks_by_status"]["pending"] == 8
+
+    data = json.loads(client.get("/api/tasks/changes").data)
+    assert sorted(task["id"] for task in data["tasks"]) == sorted(ids)
+
+
+def test_reshard(file_app, tmp_path):
+    """Test that resharding moves tasks to their new shard and keeps their IDs."""
+    app = make_app(file_app, tmp_path, 1)
+    tasks = create_users_and_tasks(app.test_client(), 6)
+    ids = sorted(task["id"] for task in tasks)
+
+    app = make_app(file_app, tmp_path, 3, reshard_from=1)
+    with app.app_context():
+        moved = reshard_tasks(1)
+        shards = {task["id"]: shard_for_user(task["user_id"]) for task in tasks}
+        # Running it again finds nothing left to move
+        assert reshard_tasks(1) == 0
+
+    assert moved == sum(1 for shard in shards.values() if shard != 0)
+    for task_id, shard in shards.items():
+        assert task_id in shard_task_ids(app, shard)
+
+    client = app.test_client()
+    data = json.loads(client.get("/api/tasks").data)
+    assert sorted(task["id"] for task in data) == ids
+
+    task_id = next(task_id for task_id, shard in shards.items() if shard != 0)
+    assert client.get(f"/api/tasks/{task_id}").status_code == 200
+
+    # New tasks on a shard do not collide with the tasks moved onto it
+    user_id = next(task["user_id"] for task in tasks if shards[task["id"]] != 0)
+    response = client.post(
+        "/api/tasks",
+        data=json.dumps({"title": "After reshard", "user_id": user_id}),
+        content_type="application/json",
+    )
+    assert response.status_code == 201
+    assert json.loads(response.data)["id"] not in ids
+
+
+def test_reshard_keeps_rows_written_during_move(file_app, tmp_path):
+    """Test that a task created while a user is moved is not deleted with the copies."""
+    app = make_app(file_app, tmp_path, 1)
+    tasks = create_users_and_tasks(app.test_client(), 6)
+
+    app = make_app(file_app, tmp_path, 3, reshard_from=1)
+    with app.app_context():
+        task = next(task for task in tasks if shard_for_user(task["user_id"]) != 0)
+        target = shard_for_user(task["user_id"])
+        late_ids = []
+
+        def write_late(connection):
+            # Lands on the old shard after the copy, before the originals are deleted
+            if not late_ids:
+                with db.engines[None].begin() as source:
+                    result = source.execute(
+                        db.insert(Task.__table__).values(title="Late", user_id=task["user_id"])
+                    )
+                late_ids.append(result.inserted_primary_key[0])
+
+        db.event.listen(db.engines[f"shard{target}"], "commit", write_late)
+        move_user_tasks(task["user_id"], 0, target)
+        db.event.remove(db.engines[f"shard{target}"], "commit", write_late)
+
+    assert task["id"] in shard_task_ids(app, target)
+    assert task["id"] not in shard_task_ids(app, 0)
+    assert late_ids[0] in shard_task_ids(app, 0)
+
+
+def test_reshard_archived_tasks(file_app, tmp_path):
+    """Test that resharding moves archived tasks along with their counts."""
+    app = make_app(file_app, tmp_path, 1)
+    client = app.test_client()
+    tasks = create_users_and_tasks(client, 6)
+    for task in tasks:
+        client.put(
+            f"/api/tasks/{task['id']}",
+            data=json.dumps({"status": "completed"}),
+            content_type="application/json",
+        )
+    with app.app_context():
+        assert archive_completed_tasks(older_than_days=0) == 6
+
+    app = make_app(file_app, tmp_path, 3, reshard_from=1)
+    with app.app_context():
+        reshard_tasks(1)
+        moved = [shard_for_user(task["user_id"]) for task in tasks]
+        for shard in range(3):
+            with use_shard(shard):
+                assert archived_counts().get(("completed", "medium"), 0) == moved.count(shard)
+
+    data = json.loads(app.test_client().get("/api/stats").data)
+    assert data["total_tasks"] == 6
+    assert data["tasks_by_status"]["completed"] == 6
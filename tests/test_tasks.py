@@ -1,7 +1,8 @@
 """Tests for task endpoints."""
 
 import json
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from app.models import Task
 
 
 def test_create_task(client):
@@ -152,3 +153,132 @@ def test_filter_tasks_by_status(client):
     data = json.loads(response.data)
     assert len(data) == 1
     assert data[0]["status"] == "pending"
+
+
+def test_get_task_changes(app, client, monkeypatch):
+    """Test syncing task changes since a cursor."""
+    monkeypatch.setitem(app.config, "SYNC_CURSOR_LAG_SECONDS", 0)
+    user_response = client.post(
+        "/api/users",
+        data=json.dumps({"username": "testuser", "email": "test@example.com"}),
+        content_type="application/json",
+    )
+    user_id = json.loads(user_response.data)["id"]
+
+    task_response = client.post(
+        "/api/tasks",
+        data=json.dumps({"title": "Task 1", "user_id": user_id}),
+        content_type="application/json",
+    )
+    task_id = json.loads(task_response.data)["id"]
+
+    # A full sync returns every task and a cursor to continue from
+    response = client.get(f"/api/tasks/changes?user_id={user_id}")
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert [task["id"] for task in data["tasks"]] == [task_id]
+    assert data["deleted"] == []
+    cursor = data["cursor"]
+
+    # Nothing changed since the cursor
+    response = client.get(f"/api/tasks/changes?since={cursor}")
+    data = json.loads(response.data)
+    assert data["tasks"] == []
+    assert data["cursor"] == cursor
+
+    # Deletions come back as tombstones
+    client.delete(f"/api/tasks/{task_id}")
+    response = client.get(f"/api/tasks/changes?since={cursor}")
+    data = json.loads(response.data)
+    assert data["tasks"] == []
+    assert [tombstone["id"] for tombstone in data["deleted"]] == [task_id]
+    assert data["cursor"] > cursor
+
+
+def test_get_task_changes_late_commit(client, db):
+    """Test that a change committed after a newer one is not skipped."""
+    user_response = client.post(
+        "/api/users",
+        data=json.dumps({"username": "testuser", "email": "test@example.com"}),
+        content_type="application/json",
+    )
+    user_id = json.loads(user_response.data)["id"]
+    task_response = client.post(
+        "/api/tasks",
+        data=json.dumps({"title": "Fast", "user_id": user_id}),
+        content_type="application/json",
+    )
+    fast = json.loads(task_response.data)
+
+    response = client.get(f"/api/tasks/changes?user_id={user_id}")
+    cursor = json.loads(response.data)["cursor"]
+    # The cursor stays behind the newest change rather than jumping to it
+    assert cursor < fast["updated_at"]
+
+    # A write stamped before the one already synced, but committed after it
+    stamped = datetime.fromisoformat(fast["updated_at"]) - timedelta(seconds=1)
+    db.session.add(Task(title="Slow", user_id=user_id, created_at=stamped, updated_at=stamped))
+    db.session.commit()
+
+    response = client.get(f"/api/tasks/changes?user_id={user_id}&since={cursor}")
+    data = json.loads(response.data)
+    assert sorted(task["title"] for task in data["tasks"]) == ["Fast", "Slow"]
+
+
+def test_get_task_changes_aware_cursor(client):
+    """Test that a cursor with a UTC offset is accepted."""
+    since = (datetime.now(timezone.utc) - timedelta(hours=1)).isoformat()
+    response = client.get("/api/tasks/changes", query_string={"since": since})
+    assert response.status_code == 200
+
+    since = datetime.now(timezone(timedelta(hours=2))).isoformat()
+    response = client.get("/api/tasks/changes", query_string={"since": since})
+    assert response.status_code == 200
+    assert json.loads(response.data)["cursor"] < datetime.utcnow().isoformat()
+
+
+def test_get_task_changes_invalid_cursor(client):
+    """Test rejecting malformed and expired sync cursors."""
+    response = client.get("/api/tasks/changes?since=yesterday")
+    assert response.status_code == 400
+
+    expired = (datetime.utcnow() - timedelta(days=365)).isoformat()
+    response = client.get(f"/api/tasks/changes?since={expired}")
+    assert response.status_code == 410
+
+
+def test_task_status_validation(client, db):
+    """Test that status and priority are validated and stored as integer codes."""
+    user_response = client.post(
+        "/api/users",
+        data=json.dumps({"username": "testuser", "email": "test@example.com"}),
+        content_type="application/json",
+    )
+    user_id = json.loads(user_response.data)["id"]
+
+    response = client.post(
+        "/api/tasks",
+        data=json.dumps({"title": "Task 1", "status": "Completed", "user_id": user_id}),
+        content_type="application/json",
+    )
+    assert response.status_code == 400
+
+    task_response = client.post(
+        "/api/tasks",
+        data=json.dumps({"title": "Task 1", "status": "in_progress", "user_id": user_id}),
+        content_type="application/json",
+    )
+    task_id = json.loads(task_response.data)["id"]
+
+    response = client.put(
+        f"/api/tasks/{task_id}",
+        data=json.dumps({"priority": "urgent"}),
+        content_type="application/json",
+    )
+    assert response.status_code == 400
+
+    response = client.get("/api/tasks?status=done")
+    assert response.status_code == 400
+
+    row = db.session.execute(db.text("SELECT status, priority FROM tasks")).one()
+    assert tuple(row) == (1, 1)